@@ -1,216 +1,1064 @@
-from typing import Any, Dict, List, Optional
-
-import anthropic
-
-
-class AIGenerator:
-    """Handles interactions with Anthropic's Claude API for generating responses"""
-
-    MAX_TOOL_ROUNDS = 2
-    DIRECT_RETURN_TOOLS = frozenset({"get_course_outline"})
-
-    # Static system prompt to avoid rebuilding on each call
-    SYSTEM_PROMPT = """ You are an AI assistant specialized in course materials and educational content with access to comprehensive tools for course information.
-
-Available Tools:
-- **search_course_content**: Search within course materials for specific content
-- **get_course_outline**: Get complete course outline with all lessons
-
-Tool Usage Guidelines:
-- Use search_course_content for detailed questions about specific topics or lessons
-- Use get_course_outline for questions about course structure, lesson lists, or "what's in this course"
-- **You can make up to 2 rounds of tool calls to gather comprehensive information**
-  - Round 1: Initial search to gather relevant information
-  - Round 2: Refine or search additional context (different course, narrower lesson, related term)
-  - Most queries need only 1 tool call. Use a second only when the first result is insufficient.
-- Synthesize tool results into accurate, fact-based responses
-- If tools yield no results, state this clearly without offering alternatives
-
-Course Outline Responses:
-When using get_course_outline:
-- Return the tool output EXACTLY as formatted - do not add summaries, context, or additional information
-- Present the complete structured list without modification
-
-Response Protocol:
-- **General knowledge questions**: Answer using existing knowledge without tools
-- **Course outline questions**: Use get_course_outline first
-- **Course-specific content questions**: Use search_course_content first, then synthesize
-- **No meta-commentary**:
-  - Provide direct answers only — no reasoning process, tool explanations, or question-type analysis
-  - Do not mention "based on the tool results"
-
-All responses must be:
-1. **Brief, Concise and focused** - Get to the point quickly
-2. **Educational** - Maintain instructional value
-3. **Clear** - Use accessible language
-4. **Example-supported** - Include relevant examples when they aid understanding
-Provide only the direct answer to what was asked.
-"""
-
-    def __init__(self, api_key: str, model: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
-        self.model = model
-
-        # Pre-build base API parameters
-        self.base_params = {"model": self.model, "temperature": 0, "max_tokens": 800}
-
-    def _call_api(self, **params):
-        """Make an Anthropic API call with standardized error handling."""
-        try:
-            return self.client.messages.create(**params)
-        except anthropic.AuthenticationError as e:
-            raise RuntimeError(f"Anthropic API authentication failed: {e}") from e
-        except anthropic.APIError as e:
-            raise RuntimeError(f"Anthropic API error: {e}") from e
-
-    def generate_response(
-        self,
-        query: str,
-        conversation_history: Optional[str] = None,
-        tools: Optional[List] = None,
-        tool_manager=None,
-    ) -> str:
-        """
-        Generate AI response with optional tool usage and conversation context.
-        Supports up to MAX_TOOL_ROUNDS sequential rounds of tool calling.
-
-        Args:
-            query: The user's question or request
-            conversation_history: Previous messages for context
-            tools: Available tools the AI can use
-            tool_manager: Manager to execute tools
-
-        Returns:
-            Generated response as string
-        """
-
-        # Build system content efficiently - avoid string ops when possible
-        system_content = (
-            f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
-            if conversation_history
-            else self.SYSTEM_PROMPT
-        )
-
-        # Start with initial messages
-        messages = [{"role": "user", "content": query}]
-
-        # Execute up to MAX_TOOL_ROUNDS rounds of tool calling
-        for round_num in range(self.MAX_TOOL_ROUNDS):
-            # Prepare API call parameters
-            api_params = {
-                **self.base_params,
-                "messages": messages,
-                "system": system_content,
-            }
-
-            # Add tools if available
-            if tools:
-                api_params["tools"] = tools
-                api_params["tool_choice"] = {"type": "auto"}
-
-            response = self._call_api(**api_params)
-
-            # Handle tool execution if needed
-            if response.stop_reason == "tool_use" and tool_manager:
-                messages, should_continue, direct_result = self._handle_tool_execution(
-                    response, messages, tool_manager
-                )
-                if direct_result is not None:
-                    return direct_result
-                if not should_continue:
-                    break
-            else:
-                # No tool use, return direct response
-                return self._extract_text(response)
-
-        # After max rounds, make final call without tools to get response
-        final_params = {
-            **self.base_params,
-            "messages": messages,
-            "system": system_content,
-        }
-
-        final_response = self._call_api(**final_params)
-        return self._extract_text(final_response)
-
-    @staticmethod
-    def _extract_text(response) -> str:
-        """Safely extract text from an API response, handling empty content."""
-        if not response.content:
-            return "I'm sorry, I wasn't able to generate a response. Please try again."
-        for block in response.content:
-            if hasattr(block, "text"):
-                return block.text
-        return "I'm sorry, I wasn't able to generate a response. Please try again."
-
-    def _handle_tool_execution(self, initial_response, messages: List, tool_manager):
-        """
-        Handle execution of tool calls and update message history.
-
-        Executes ALL tool calls before deciding flow control. This ensures the
-        Anthropic API receives tool_result blocks for every tool_use block, even
-        if some tools fail.
-
-        Args:
-            initial_response: The response containing tool use requests
-            messages: Current message history
-            tool_manager: Manager to execute tools
-
-        Returns:
-            Tuple of (updated_messages, should_continue, direct_result)
-            direct_result is non-None when the tool output should be returned as-is
-        """
-        # Add AI's tool use response
-        messages.append({"role": "assistant", "content": initial_response.content})
-
-        # Execute ALL tool calls and collect results
-        tool_results = []
-        direct_return_result = None
-        has_error = False
-
-        for content_block in initial_response.content:
-            if content_block.type != "tool_use":
-                continue
-
-            try:
-                tool_result = tool_manager.execute_tool(
-                    content_block.name, **content_block.input
-                )
-
-                tool_results.append(
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": content_block.id,
-                        "content": tool_result,
-                    }
-                )
-
-                # Mark outline results for direct return (but keep executing remaining tools)
-                if content_block.name in self.DIRECT_RETURN_TOOLS:
-                    direct_return_result = tool_result
-
-            except Exception as e:
-                has_error = True
-                tool_results.append(
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": content_block.id,
-                        "content": f"Error: Tool execution failed - {str(e)}",
-                        "is_error": True,
-                    }
-                )
-
-        # Add all tool results as single message
-        if tool_results:
-            messages.append({"role": "user", "content": tool_results})
-
-        # Direct return takes priority (e.g. course outline)
-        if direct_return_result is not None:
-            return messages, False, direct_return_result
-
-        # Stop rounds if any tool failed
-        if has_error:
-            return messages, False, None
-
-        # Continue with next round
-        return messages, True, None
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Final, List, Optional
+
+import httpx
+
+from response_cache import ResponseCache
+
+
+def _import_anthropic():
+    """Bind the anthropic SDK into module globals on first use.
+
+    Deferring the import keeps module load (FastAPI cold start, pytest
+    collection) from paying for the full SDK; binding the global means all
+    later anthropic.* references resolve normally.
+    """
+    global anthropic
+    import anthropic
+
+    return anthropic
+
+
+def __getattr__(name):
+    # Keep ai_generator.anthropic resolvable before first use - tests patch
+    # ai_generator.anthropic.Anthropic, which lands here on a fresh import
+    if name == "anthropic":
+        return _import_anthropic()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Shared across all requests - tool_choice never varies, so one dict suffices
+_AUTO_TOOL_CHOICE = {"type": "auto"}
+
+# Shared httpx pool so sequential Claude calls reuse warm TLS connections
+# instead of paying a handshake per round (and across AIGenerator instances)
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _shared_http_client() -> httpx.Client:
+    """Return the process-wide pooled httpx client, creating it on first use"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0
+            ),
+            timeout=httpx.Timeout(20.0, connect=5.0),
+        )
+    return _http_client
+
+
+def _shared_async_http_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled async httpx client.
+
+    Sized larger than the sync pool because the async path serves concurrent
+    request handlers rather than one interactive loop.
+    """
+    global _async_http_client
+    if _async_http_client is None:
+        _async_http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=50,
+                keepalive_expiry=30.0,
+            ),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        )
+    return _async_http_client
+
+
+# Static system prompt, interned so identity and hash checks are cheap and
+# the prompt-cache prefix stays a single stable object
+SYSTEM_PROMPT: Final[str] = sys.intern(
+    """ You are an AI assistant specialized in course materials and educational content with access to comprehensive tools for course information.
+
+Available Tools:
+- **search_course_content**: Search within course materials for specific content
+- **get_course_outline**: Get complete course outline with all lessons
+
+Tool Usage Guidelines:
+- Use search_course_content for detailed questions about specific topics or lessons
+- Use get_course_outline for questions about course structure, lesson lists, or "what's in this course"
+- **You can make up to 2 rounds of tool calls to gather comprehensive information**
+  - Round 1: Initial search to gather relevant information
+  - Round 2: Refine or search additional context (different course, narrower lesson, related term)
+  - Most queries need only 1 tool call. Use a second only when the first result is insufficient.
+- Synthesize tool results into accurate, fact-based responses
+- If tools yield no results, state this clearly without offering alternatives
+
+Course Outline Responses:
+When using get_course_outline:
+- Return the tool output EXACTLY as formatted - do not add summaries, context, or additional information
+- Present the complete structured list without modification
+
+Response Protocol:
+- **General knowledge questions**: Answer using existing knowledge without tools
+- **Course outline questions**: Use get_course_outline first
+- **Course-specific content questions**: Use search_course_content first, then synthesize
+- **No meta-commentary**:
+  - Provide direct answers only — no reasoning process, tool explanations, or question-type analysis
+  - Do not mention "based on the tool results"
+
+All responses must be:
+1. **Brief, Concise and focused** - Get to the point quickly
+2. **Educational** - Maintain instructional value
+3. **Clear** - Use accessible language
+4. **Example-supported** - Include relevant examples when they aid understanding
+Provide only the direct answer to what was asked.
+"""
+)
+
+
+class AIGenerator:
+    """Handles interactions with Anthropic's Claude API for generating responses"""
+
+    MAX_TOOL_ROUNDS = 2
+    DIRECT_RETURN_TOOLS = frozenset({"get_course_outline"})
+
+    # Tool-result compaction: combined output size that triggers it, and the
+    # characters kept per oversized result
+    TOOL_RESULT_COMPACT_THRESHOLD = 4096
+    TOOL_RESULT_COMPACT_LIMIT = 800
+
+    # Served directly when every tool result comes back empty - there is
+    # nothing for Claude to synthesize, so skip the extra API round trip
+    NO_RESULT_RESPONSE = (
+        "No relevant course content was found for your question. "
+        "Try rephrasing it or asking about a different course or lesson."
+    )
+
+    # Alias kept for backward compatibility (tests and callers read it here)
+    SYSTEM_PROMPT = SYSTEM_PROMPT
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        response_cache: Optional[ResponseCache] = None,
+        client: Optional[anthropic.Anthropic] = None,
+        service_tier: Optional[str] = None,
+    ):
+        anthropic = _import_anthropic()
+        # max_retries lets the SDK transport absorb transient 429/5xx with
+        # jittered exponential backoff before we ever see the error
+        self.client = client or anthropic.Anthropic(
+            api_key=api_key, http_client=_shared_http_client(), max_retries=4
+        )
+        self.aclient = anthropic.AsyncAnthropic(
+            api_key=api_key, http_client=_shared_async_http_client(), max_retries=4
+        )
+        self.model = model
+        self.response_cache = response_cache
+
+        # Optional summarizer for oversized tool results; defaults to plain
+        # truncation when unset (callers can inject something smarter)
+        self.compact_hook: Optional[Callable[[str], str]] = None
+
+        # Precompute the cache-marked system block once so every request
+        # sends a byte-identical prefix (prompt-cache hits require stability)
+        self._system_prefix = {
+            "type": "text",
+            "text": SYSTEM_PROMPT,
+            "cache_control": {"type": "ephemeral"},
+        }
+
+        # Cache-marked tools copy per caller-supplied list; RAG setups pass
+        # the same tools object on every query, so mark it once. The SDK
+        # offers no way to inject pre-serialized JSON bytes for tools, so a
+        # stable already-canonicalized list is as far down as we can cache.
+        self._tools_cache: Dict[int, tuple] = {}
+
+        # Pre-build base API parameters
+        # The beta header enables prompt caching so the static system + tools
+        # prefix is served from Anthropic's cache on rounds 2 and 3
+        self.base_params = {
+            "model": self.model,
+            "temperature": 0,
+            "max_tokens": 800,
+            "extra_headers": {"anthropic-beta": "prompt-caching-2024-07-31"},
+        }
+        # Optional lower-latency inference tier; off by default so mocked
+        # clients and standard-tier deployments see identical requests
+        if service_tier:
+            self.base_params["extra_body"] = {"service_tier": service_tier}
+
+        # Bind generation params (model, sampling, system prompt) into the
+        # response-cache signature so a config change never serves stale hits
+        if self.response_cache:
+            self.response_cache.bind_request_params(
+                {
+                    **{
+                        key: value
+                        for key, value in self.base_params.items()
+                        if key != "extra_headers"
+                    },
+                    "system": SYSTEM_PROMPT,
+                }
+            )
+
+    async def aclose(self):
+        """Close the shared async connection pool on application shutdown.
+
+        Lets in-flight keepalive connections drain cleanly instead of being
+        torn down by the event loop's garbage collection.
+        """
+        global _async_http_client
+        if _async_http_client is not None:
+            await _async_http_client.aclose()
+            _async_http_client = None
+
+    def _call_api(self, **params):
+        """Make an Anthropic API call with standardized error handling.
+
+        Transient failures are retried by the SDK transport; only clearly
+        non-retryable errors are wrapped here, and anything that survives
+        the SDK's retries propagates as-is for the caller to surface.
+        """
+        try:
+            return self.client.messages.create(**params)
+        except anthropic.AuthenticationError as e:
+            raise RuntimeError(f"Anthropic API authentication failed: {e}") from e
+        except (
+            anthropic.BadRequestError,
+            anthropic.PermissionDeniedError,
+            anthropic.NotFoundError,
+            anthropic.UnprocessableEntityError,
+        ) as e:
+            raise RuntimeError(f"Anthropic API error: {e}") from e
+
+    def generate_response(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+    ) -> str:
+        """
+        Generate AI response with optional tool usage and conversation context.
+        Supports up to MAX_TOOL_ROUNDS sequential rounds of tool calling.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+
+        Returns:
+            Generated response as string
+        """
+        # Serve repeated/similar queries from the cache without touching the API
+        if self.response_cache:
+            cached = self.response_cache.lookup(query, conversation_history, tools)
+            if cached is not None:
+                return self._unpack_cached(cached, tool_manager)
+
+        response = self._generate(query, conversation_history, tools, tool_manager)
+
+        if self.response_cache:
+            self.response_cache.update(
+                query,
+                conversation_history,
+                tools,
+                self._pack_for_cache(response, tool_manager),
+            )
+        return response
+
+    @staticmethod
+    def _snapshot_sources(tool_manager) -> tuple:
+        """Read the tool manager's currently tracked (sources, source_links)"""
+        if tool_manager is None:
+            return [], []
+        return (
+            tool_manager.get_last_sources(),
+            tool_manager.get_last_source_links(),
+        )
+
+    @classmethod
+    def _pack_for_cache(cls, response: str, tool_manager) -> tuple:
+        """Bundle the response with its tracked sources for caching.
+
+        Cache hits skip tool execution entirely, so the sources the tools
+        tracked during generation must be stored with the answer - otherwise
+        a hit would silently return an answer with no sources.
+        """
+        sources, source_links = cls._snapshot_sources(tool_manager)
+        return response, sources, source_links
+
+    @staticmethod
+    def _unpack_cached(cached: tuple, tool_manager) -> str:
+        """Restore cached sources into the tool manager and return the answer"""
+        response, sources, source_links = cached
+        if tool_manager is not None:
+            for tool in tool_manager.tools.values():
+                if hasattr(tool, "last_sources"):
+                    tool.last_sources = sources
+                    tool.last_source_links = source_links
+                    break
+        return response
+
+    def _prepare_request(
+        self,
+        query: str,
+        conversation_history: Optional[str],
+        tools: Optional[List],
+    ):
+        """Build the system blocks, cache-marked tools, and initial messages."""
+        # System prompt always leads as the precomputed cache-marked block so
+        # the byte-identical prefix hits Anthropic's prompt cache on every
+        # round; conversation history rides in a separate, uncached block
+        system_content = [self._system_prefix]
+        if conversation_history:
+            system_content.append(
+                {
+                    "type": "text",
+                    "text": f"Previous conversation:\n{conversation_history}",
+                }
+            )
+
+        # Mark the last tool schema so the whole tools block joins the cached
+        # prefix (copy so the caller's definitions aren't mutated); memoized
+        # per tools list since callers reuse the same definitions every query
+        if tools:
+            cached = self._tools_cache.get(id(tools))
+            if cached is not None and cached[0] is tools:
+                tools = cached[1]
+            else:
+                marked = [
+                    *tools[:-1],
+                    {**tools[-1], "cache_control": {"type": "ephemeral"}},
+                ]
+                self._tools_cache[id(tools)] = (tools, marked)
+                tools = marked
+
+        # Start with initial messages
+        messages = [{"role": "user", "content": query}]
+
+        return system_content, tools, messages
+
+    def _generate(
+        self,
+        query: str,
+        conversation_history: Optional[str],
+        tools: Optional[List],
+        tool_manager,
+    ) -> str:
+        """Run the tool-calling loop and return the final response text."""
+        system_content, tools, messages = self._prepare_request(
+            query, conversation_history, tools
+        )
+
+        # Build API parameters once - messages is mutated in place across
+        # rounds, so the dict never needs rebuilding per iteration
+        api_params = {
+            **self.base_params,
+            "messages": messages,
+            "system": system_content,
+        }
+
+        # Fast path: with no tools to dispatch there is nothing to loop
+        # over - one call, one answer
+        if not tools or not tool_manager:
+            return self._extract_text(self._call_api(**api_params))
+
+        api_params["tools"] = tools
+        api_params["tool_choice"] = _AUTO_TOOL_CHOICE
+
+        # Execute up to MAX_TOOL_ROUNDS rounds of tool calling
+        for round_num in range(self.MAX_TOOL_ROUNDS):
+            response = self._call_api(**api_params)
+
+            # Handle tool execution if needed
+            if response.stop_reason == "tool_use":
+                messages, should_continue, direct_result = self._handle_tool_execution(
+                    response, messages, tool_manager
+                )
+                if direct_result is not None:
+                    return direct_result
+                if not should_continue:
+                    break
+            else:
+                # No tool use, return direct response
+                return self._extract_text(response)
+
+        # After max rounds, strip tools for the final synthesis call instead
+        # of constructing fresh params
+        api_params.pop("tools", None)
+        api_params.pop("tool_choice", None)
+
+        final_response = self._call_api(**api_params)
+        return self._extract_text(final_response)
+
+    BATCH_POLL_INTERVAL = 5.0  # Seconds between Message Batches status polls
+    # Deadline for a whole batch: Message Batches may take up to 24 hours,
+    # and this poll loop is reachable from an HTTP handler, so give up
+    # (cancel the batch and raise) rather than pin a worker indefinitely
+    BATCH_POLL_TIMEOUT = 600.0
+
+    def _split_batch_items(self, items: List[Dict[str, Any]]):
+        """Partition batch items into Batches-API requests and tool indices.
+
+        Tool-using queries need the interactive loop; everything else is
+        prepared as a Message Batches request.
+        """
+        batch_requests = []
+        tool_indices = []
+        for index, item in enumerate(items):
+            if item.get("tools") and item.get("tool_manager"):
+                tool_indices.append(index)
+                continue
+
+            system_content, _, messages = self._prepare_request(
+                item["query"], item.get("conversation_history"), None
+            )
+            # extra_headers and extra_body are SDK kwargs, not message
+            # params - leaking either into a batch request gets a 400
+            params = {
+                key: value
+                for key, value in self.base_params.items()
+                if key not in ("extra_headers", "extra_body")
+            }
+            params["messages"] = messages
+            params["system"] = system_content
+            batch_requests.append(
+                {"custom_id": f"query-{index}", "params": params}
+            )
+        return batch_requests, tool_indices
+
+    def _collect_batch_results(
+        self, batch_requests: List[Dict[str, Any]], results: List[Optional[str]]
+    ):
+        """Submit a Message Batch, poll it to completion, and fill results"""
+        try:
+            batch = self.client.messages.batches.create(requests=batch_requests)
+            deadline = time.monotonic() + self.BATCH_POLL_TIMEOUT
+            while batch.processing_status != "ended":
+                if time.monotonic() >= deadline:
+                    self.client.messages.batches.cancel(batch.id)
+                    raise RuntimeError(
+                        f"Batch {batch.id} did not finish within "
+                        f"{self.BATCH_POLL_TIMEOUT:.0f}s and was cancelled"
+                    )
+                time.sleep(self.BATCH_POLL_INTERVAL)
+                batch = self.client.messages.batches.retrieve(batch.id)
+
+            for entry in self.client.messages.batches.results(batch.id):
+                index = int(entry.custom_id.rsplit("-", 1)[1])
+                if entry.result.type == "succeeded":
+                    results[index] = self._extract_text(entry.result.message)
+                else:
+                    results[index] = (
+                        f"Error: Batch request failed - {entry.result.type}"
+                    )
+        except anthropic.APIError as e:
+            raise RuntimeError(f"Anthropic API error: {e}") from e
+
+    def generate_responses_batch(self, items: List[Dict[str, Any]]) -> List[str]:
+        """
+        Generate responses for multiple independent queries in one pass.
+
+        Items without tools are submitted together through Anthropic's
+        Message Batches API (one request instead of K round-trips, at
+        discounted token rates). Items that need tool dispatch run the
+        interactive loop concurrently on worker threads with the sync
+        client - spinning up a private event loop here would bind the
+        shared async pool's connections to a throwaway loop and poison
+        later async callers. Use agenerate_responses_batch from async code.
+
+        Args:
+            items: Dicts with "query" and optional "conversation_history",
+                "tools", and "tool_manager" keys
+
+        Returns:
+            Generated responses in the same order as items
+        """
+        results: List[Optional[str]] = [None] * len(items)
+        batch_requests, tool_indices = self._split_batch_items(items)
+
+        if batch_requests:
+            self._collect_batch_results(batch_requests, results)
+
+        if tool_indices:
+            with ThreadPoolExecutor(
+                max_workers=min(8, len(tool_indices))
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        self.generate_response,
+                        query=items[index]["query"],
+                        conversation_history=items[index].get("conversation_history"),
+                        tools=items[index].get("tools"),
+                        tool_manager=items[index].get("tool_manager"),
+                    )
+                    for index in tool_indices
+                ]
+                for index, future in zip(tool_indices, futures):
+                    results[index] = future.result()
+
+        return results
+
+    async def agenerate_responses_batch(
+        self, items: List[Dict[str, Any]]
+    ) -> List[str]:
+        """
+        Async variant of generate_responses_batch for callers on an event loop.
+
+        The Batches submission and polling are blocking SDK calls, so they
+        run in a worker thread; tool items gather on the running loop, which
+        keeps the shared async connection pool bound to a single loop.
+        """
+        results: List[Optional[str]] = [None] * len(items)
+        batch_requests, tool_indices = self._split_batch_items(items)
+
+        if batch_requests:
+            await asyncio.to_thread(
+                self._collect_batch_results, batch_requests, results
+            )
+
+        if tool_indices:
+            texts = await asyncio.gather(
+                *[
+                    self.agenerate_response(
+                        query=items[index]["query"],
+                        conversation_history=items[index].get("conversation_history"),
+                        tools=items[index].get("tools"),
+                        tool_manager=items[index].get("tool_manager"),
+                    )
+                    for index in tool_indices
+                ]
+            )
+            for index, text in zip(tool_indices, texts):
+                results[index] = text
+
+        return results
+
+    def _stream_text(self, params):
+        """Yield text deltas from a streaming API call with standardized error handling."""
+        try:
+            with self.client.messages.stream(**params) as stream:
+                for text in stream.text_stream:
+                    yield text
+        except anthropic.AuthenticationError as e:
+            raise RuntimeError(f"Anthropic API authentication failed: {e}") from e
+        except (
+            anthropic.BadRequestError,
+            anthropic.PermissionDeniedError,
+            anthropic.NotFoundError,
+            anthropic.UnprocessableEntityError,
+        ) as e:
+            raise RuntimeError(f"Anthropic API error: {e}") from e
+
+    def generate_response_stream(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+    ):
+        """
+        Generate a response as an iterator of text chunks.
+
+        Tool-use rounds stay non-streaming (the full tool_use blocks are
+        needed before dispatch); the terminal call streams so callers see
+        first tokens instead of waiting for the whole completion. Mirrors
+        generate_response semantics, including the response cache.
+
+        Yields:
+            Text chunks of the generated response
+        """
+        if self.response_cache:
+            cached = self.response_cache.lookup(query, conversation_history, tools)
+            if cached is not None:
+                yield self._unpack_cached(cached, tool_manager)
+                return
+
+        chunks = []
+        sources = None
+        for chunk in self._generate_stream(
+            query, conversation_history, tools, tool_manager
+        ):
+            if self.response_cache and sources is None:
+                # Tool rounds finish before the first chunk streams, and the
+                # caller may read-and-reset the ContextVar-backed sources in
+                # this same resumption (the SSE path does, since they're
+                # gone by the next one) - snapshot them for the cache now,
+                # not at stream end
+                sources = self._snapshot_sources(tool_manager)
+            chunks.append(chunk)
+            yield chunk
+
+        if self.response_cache:
+            cached_sources, cached_links = sources if sources is not None else ([], [])
+            self.response_cache.update(
+                query,
+                conversation_history,
+                tools,
+                ("".join(chunks), cached_sources, cached_links),
+            )
+
+    def _generate_stream(
+        self,
+        query: str,
+        conversation_history: Optional[str],
+        tools: Optional[List],
+        tool_manager,
+    ):
+        """Streaming tool-calling loop mirroring _generate."""
+        system_content, tools, messages = self._prepare_request(
+            query, conversation_history, tools
+        )
+
+        # No tools means a single terminal call - stream it directly
+        if not tools or not tool_manager:
+            yield from self._stream_text(
+                {**self.base_params, "messages": messages, "system": system_content}
+            )
+            return
+
+        # Build API parameters once - messages is mutated in place across rounds
+        api_params = {
+            **self.base_params,
+            "messages": messages,
+            "system": system_content,
+            "tools": tools,
+            "tool_choice": _AUTO_TOOL_CHOICE,
+        }
+
+        for round_num in range(self.MAX_TOOL_ROUNDS):
+            response = self._call_api(**api_params)
+
+            if response.stop_reason == "tool_use":
+                messages, should_continue, direct_result = self._handle_tool_execution(
+                    response, messages, tool_manager
+                )
+                if direct_result is not None:
+                    yield direct_result
+                    return
+                if not should_continue:
+                    break
+            else:
+                yield self._extract_text(response)
+                return
+
+        # After max rounds, stream the final synthesis call without tools
+        api_params.pop("tools", None)
+        api_params.pop("tool_choice", None)
+        yield from self._stream_text(api_params)
+
+    async def _acall_api(self, **params):
+        """Make an async Anthropic API call with standardized error handling."""
+        try:
+            return await self.aclient.messages.create(**params)
+        except anthropic.AuthenticationError as e:
+            raise RuntimeError(f"Anthropic API authentication failed: {e}") from e
+        except (
+            anthropic.BadRequestError,
+            anthropic.PermissionDeniedError,
+            anthropic.NotFoundError,
+            anthropic.UnprocessableEntityError,
+        ) as e:
+            raise RuntimeError(f"Anthropic API error: {e}") from e
+
+    async def agenerate_response(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+    ) -> str:
+        """
+        Async variant of generate_response.
+
+        API calls await the event loop instead of blocking it, and multiple
+        tool_use blocks in one response execute concurrently.
+        """
+        # Cache lookups/updates may run a SentenceTransformer encode
+        # (including its first-use model load), so they go through a worker
+        # thread instead of blocking the event loop
+        if self.response_cache:
+            cached = await asyncio.to_thread(
+                self.response_cache.lookup, query, conversation_history, tools
+            )
+            if cached is not None:
+                return self._unpack_cached(cached, tool_manager)
+
+        response = await self._agenerate(query, conversation_history, tools, tool_manager)
+
+        if self.response_cache:
+            await asyncio.to_thread(
+                self.response_cache.update,
+                query,
+                conversation_history,
+                tools,
+                self._pack_for_cache(response, tool_manager),
+            )
+        return response
+
+    async def _agenerate(
+        self,
+        query: str,
+        conversation_history: Optional[str],
+        tools: Optional[List],
+        tool_manager,
+    ) -> str:
+        """Async tool-calling loop mirroring _generate."""
+        system_content, tools, messages = self._prepare_request(
+            query, conversation_history, tools
+        )
+
+        # Build API parameters once - messages is mutated in place across rounds
+        api_params = {
+            **self.base_params,
+            "messages": messages,
+            "system": system_content,
+        }
+
+        # Fast path: no tools means a single call
+        if not tools or not tool_manager:
+            return self._extract_text(await self._acall_api(**api_params))
+
+        api_params["tools"] = tools
+        api_params["tool_choice"] = _AUTO_TOOL_CHOICE
+
+        for round_num in range(self.MAX_TOOL_ROUNDS):
+            response = await self._acall_api(**api_params)
+
+            if response.stop_reason == "tool_use":
+                messages, should_continue, direct_result = (
+                    await self._ahandle_tool_execution(response, messages, tool_manager)
+                )
+                if direct_result is not None:
+                    return direct_result
+                if not should_continue:
+                    break
+            else:
+                return self._extract_text(response)
+
+        # Strip tools for the final synthesis call instead of rebuilding params
+        api_params.pop("tools", None)
+        api_params.pop("tool_choice", None)
+
+        final_response = await self._acall_api(**api_params)
+        return self._extract_text(final_response)
+
+    async def _ahandle_tool_execution(
+        self, initial_response, messages: List, tool_manager
+    ):
+        """
+        Async counterpart of _handle_tool_execution.
+
+        All tool calls in the response run concurrently via asyncio.gather,
+        so N tools in one round cost max(t_i) instead of sum(t_i). Flow
+        control (direct return, error handling) matches the sync path.
+        """
+        messages.append({"role": "assistant", "content": initial_response.content})
+
+        tool_uses = [
+            block for block in initial_response.content if block.type == "tool_use"
+        ]
+        # Distinct (name, args) pairs run once; identical parallel calls
+        # share the result. Each worker runs in an explicit context copy
+        # whose updates are merged back afterwards, so ContextVar state the
+        # tools set (source tracking) survives the thread hop
+        keys, unique_keys, unique_blocks = self._dedupe_tool_uses(tool_uses)
+        contexts = [contextvars.copy_context() for _ in unique_blocks]
+        unique_results = await asyncio.gather(
+            *[
+                asyncio.to_thread(
+                    ctx.run, tool_manager.execute_tool, block.name, **block.input
+                )
+                for ctx, block in zip(contexts, unique_blocks)
+            ],
+            return_exceptions=True,
+        )
+        for ctx in contexts:
+            for var, value in ctx.items():
+                var.set(value)
+        results_by_key = dict(zip(unique_keys, unique_results))
+        results = [results_by_key[key] for key in keys]
+
+        tool_results = []
+        direct_return_result = None
+        has_error = False
+
+        for block, result in zip(tool_uses, results):
+            if isinstance(result, Exception):
+                has_error = True
+                tool_results.append(
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": block.id,
+                        "content": f"Error: Tool execution failed - {str(result)}",
+                        "is_error": True,
+                    }
+                )
+                continue
+
+            tool_results.append(
+                {
+                    "type": "tool_result",
+                    "tool_use_id": block.id,
+                    "content": result,
+                }
+            )
+
+            if block.name in self.DIRECT_RETURN_TOOLS:
+                direct_return_result = result
+
+        if tool_results:
+            messages.append({"role": "user", "content": tool_results})
+
+        if direct_return_result is not None:
+            return messages, False, direct_return_result
+
+        if has_error:
+            return messages, False, None
+
+        # All searches came back empty: serve the canned response instead of
+        # paying for a synthesis call that can only restate "nothing found"
+        if tool_results and all(
+            self._is_no_result(result["content"]) for result in tool_results
+        ):
+            return messages, False, self.NO_RESULT_RESPONSE
+
+        # Compact bulky output before the next round re-sends it as input
+        # tokens; direct returns above keep their raw results
+        self._compact_tool_results(tool_results)
+
+        return messages, True, None
+
+    @staticmethod
+    def _dedupe_tool_uses(tool_uses: List):
+        """
+        Group tool_use blocks by (name, canonical args).
+
+        Returns (keys, unique_keys, unique_blocks): a key per block in
+        request order, the distinct keys in first-seen order, and one
+        representative block per distinct key.
+        """
+        keys = [
+            (block.name, json.dumps(block.input or {}, sort_keys=True, default=str))
+            for block in tool_uses
+        ]
+        unique_keys = list(dict.fromkeys(keys))
+        unique_blocks = [tool_uses[keys.index(key)] for key in unique_keys]
+        return keys, unique_keys, unique_blocks
+
+    @staticmethod
+    def _dispatch_tools(tool_uses: List, tool_manager) -> List[Any]:
+        """
+        Execute tool_use blocks, concurrently when there is more than one.
+
+        Returns outcomes in block order; a failed call's slot holds the
+        raised exception so the caller can build an is_error tool_result.
+        """
+        if len(tool_uses) <= 1:
+            outcomes = []
+            for block in tool_uses:
+                try:
+                    outcomes.append(tool_manager.execute_tool(block.name, **block.input))
+                except Exception as e:
+                    outcomes.append(e)
+            return outcomes
+
+        # Run each call in a context copy and merge updates back so ContextVar
+        # state the tools set (source tracking) isn't lost in worker threads
+        contexts = [contextvars.copy_context() for _ in tool_uses]
+        with ThreadPoolExecutor(max_workers=len(tool_uses)) as executor:
+            futures = [
+                executor.submit(
+                    ctx.run, tool_manager.execute_tool, block.name, **block.input
+                )
+                for ctx, block in zip(contexts, tool_uses)
+            ]
+            outcomes = []
+            for future in futures:
+                try:
+                    outcomes.append(future.result())
+                except Exception as e:
+                    outcomes.append(e)
+        for ctx in contexts:
+            for var, value in ctx.items():
+                var.set(value)
+        return outcomes
+
+    def _compact_tool_results(self, tool_results: List[Dict]):
+        """
+        Shrink bulky tool results before they are re-sent to the API.
+
+        Each round feeds the full message history back to Claude, so large
+        search outputs roughly double round-2 input tokens. When the combined
+        output exceeds TOOL_RESULT_COMPACT_THRESHOLD, each oversized result is
+        truncated in place (or run through compact_hook when one is injected).
+        """
+        total_size = sum(len(str(result["content"])) for result in tool_results)
+        if total_size <= self.TOOL_RESULT_COMPACT_THRESHOLD:
+            return
+
+        for result in tool_results:
+            content = result["content"]
+            if (
+                not isinstance(content, str)
+                or len(content) <= self.TOOL_RESULT_COMPACT_LIMIT
+            ):
+                continue
+            if self.compact_hook:
+                result["content"] = self.compact_hook(content)
+            else:
+                result["content"] = (
+                    content[: self.TOOL_RESULT_COMPACT_LIMIT] + "…[truncated]"
+                )
+
+    @staticmethod
+    def _is_no_result(content: Any) -> bool:
+        """True when a tool result is the search tool's empty-result sentinel."""
+        return isinstance(content, str) and (
+            not content.strip() or content.startswith("No relevant content found")
+        )
+
+    @staticmethod
+    def _extract_text(response) -> str:
+        """Safely extract text from an API response, handling empty content."""
+        if not response.content:
+            return "I'm sorry, I wasn't able to generate a response. Please try again."
+        for block in response.content:
+            text = getattr(block, "text", None)
+            if text is not None:
+                return text
+        return "I'm sorry, I wasn't able to generate a response. Please try again."
+
+    def _handle_tool_execution(self, initial_response, messages: List, tool_manager):
+        """
+        Handle execution of tool calls and update message history.
+
+        Executes ALL tool calls before deciding flow control. This ensures the
+        Anthropic API receives tool_result blocks for every tool_use block, even
+        if some tools fail.
+
+        Args:
+            initial_response: The response containing tool use requests
+            messages: Current message history
+            tool_manager: Manager to execute tools
+
+        Returns:
+            Tuple of (updated_messages, should_continue, direct_result)
+            direct_result is non-None when the tool output should be returned as-is
+        """
+        # Add AI's tool use response
+        messages.append({"role": "assistant", "content": initial_response.content})
+
+        # Collect tool_use blocks in one pass, then dispatch - keeps the
+        # dispatch loop branch-free and matches the async path's structure
+        tool_uses = [
+            block for block in initial_response.content if block.type == "tool_use"
+        ]
+
+        # Fast path: a lone direct-return tool call (e.g. course outline)
+        # skips the dispatch/collect machinery entirely - its output is the
+        # final answer, so no tool_result round trip is needed
+        if len(tool_uses) == 1 and tool_uses[0].name in self.DIRECT_RETURN_TOOLS:
+            block = tool_uses[0]
+            try:
+                result = tool_manager.execute_tool(block.name, **block.input)
+            except Exception as e:
+                messages.append(
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "tool_result",
+                                "tool_use_id": block.id,
+                                "content": f"Error: Tool execution failed - {str(e)}",
+                                "is_error": True,
+                            }
+                        ],
+                    }
+                )
+                return messages, False, None
+            messages.append(
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "tool_result",
+                            "tool_use_id": block.id,
+                            "content": result,
+                        }
+                    ],
+                }
+            )
+            return messages, False, result
+
+        # Execute ALL tool calls; parallel tool_use blocks dispatch
+        # concurrently since the work is I/O-bound (vector store + embedding),
+        # so N calls cost max(t_i) instead of sum(t_i). Claude occasionally
+        # issues identical parallel calls - each distinct (name, args) pair
+        # runs once and the result fans out to every requesting block
+        keys, unique_keys, unique_blocks = self._dedupe_tool_uses(tool_uses)
+        outcomes_by_key = dict(
+            zip(unique_keys, self._dispatch_tools(unique_blocks, tool_manager))
+        )
+        outcomes = [outcomes_by_key[key] for key in keys]
+
+        # Collect results in request order so tool_use_id alignment holds
+        tool_results = []
+        direct_return_result = None
+        has_error = False
+
+        for block, outcome in zip(tool_uses, outcomes):
+            if isinstance(outcome, Exception):
+                has_error = True
+                tool_results.append(
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": block.id,
+                        "content": f"Error: Tool execution failed - {str(outcome)}",
+                        "is_error": True,
+                    }
+                )
+                continue
+
+            tool_results.append(
+                {
+                    "type": "tool_result",
+                    "tool_use_id": block.id,
+                    "content": outcome,
+                }
+            )
+
+            # Mark outline results for direct return (but keep the remaining results)
+            if block.name in self.DIRECT_RETURN_TOOLS:
+                direct_return_result = outcome
+
+        # Add all tool results as single message
+        if tool_results:
+            messages.append({"role": "user", "content": tool_results})
+
+        # Direct return takes priority (e.g. course outline)
+        if direct_return_result is not None:
+            return messages, False, direct_return_result
+
+        # Stop rounds if any tool failed
+        if has_error:
+            return messages, False, None
+
+        # All searches came back empty: serve the canned response instead of
+        # paying for a synthesis call that can only restate "nothing found"
+        if tool_results and all(
+            self._is_no_result(result["content"]) for result in tool_results
+        ):
+            return messages, False, self.NO_RESULT_RESPONSE
+
+        # Compact bulky output before the next round re-sends it as input
+        # tokens; direct returns above keep their raw results
+        self._compact_tool_results(tool_results)
+
+        # Continue with next round
+        return messages, True, None
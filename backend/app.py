@@ -4,17 +4,25 @@ warnings.filterwarnings("ignore", message="resource_tracker: There appear to be.
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Union
+import json
 import os
 
 from config import config
 from rag_system import RAGSystem
 
 # Initialize FastAPI app
-app = FastAPI(title="Course Materials RAG System", root_path="")
+# ORJSONResponse serializes responses with orjson (C-level, several times
+# faster than the stdlib encoder on the list-heavy payloads we return)
+app = FastAPI(
+    title="Course Materials RAG System",
+    root_path="",
+    default_response_class=ORJSONResponse,
+)
 
 # Add trusted host middleware for proxy
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
@@ -49,6 +57,23 @@ class QueryResponse(BaseModel):
     session_id: str
 
 
+class BatchQueryRequest(BaseModel):
+    """Request model for batched course queries.
+
+    use_search=False skips course search and routes the whole batch
+    through the discounted Message Batches API.
+    """
+
+    queries: List[str]
+    use_search: bool = True
+
+
+class BatchQueryResponse(BaseModel):
+    """Response model for batched course queries"""
+
+    answers: List[str]
+
+
 class CourseStats(BaseModel):
     """Response model for course statistics"""
 
@@ -74,14 +99,45 @@ async def query_documents(request: QueryRequest):
         if not session_id:
             session_id = rag_system.session_manager.create_session()
 
-        # Process query using RAG system
-        answer, sources, source_links = rag_system.query(request.query, session_id)
+        # Process query using RAG system without blocking the event loop
+        answer, sources, source_links = await rag_system.aquery(
+            request.query, session_id
+        )
 
         return QueryResponse(answer=answer, sources=sources, session_id=session_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/query/batch", response_model=BatchQueryResponse)
+async def query_documents_batch(request: BatchQueryRequest):
+    """Process multiple independent queries in one batch"""
+    try:
+        answers = await rag_system.query_batch(
+            request.queries, use_search=request.use_search
+        )
+        return BatchQueryResponse(answers=answers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/query/stream")
+async def query_documents_stream(request: QueryRequest):
+    """Stream a query response as server-sent events"""
+    # Create session if not provided
+    session_id = request.session_id
+    if not session_id:
+        session_id = rag_system.session_manager.create_session()
+
+    def event_stream():
+        for event in rag_system.query_stream(request.query, session_id):
+            yield f"data: {json.dumps(event)}\n\n"
+        # Final frame so the client can persist the session
+        yield f"data: {json.dumps({'session_id': session_id})}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.get("/api/courses", response_model=CourseStats)
 async def get_course_stats():
     """Get course analytics and statistics"""
@@ -105,6 +161,12 @@ async def clear_session(request: ClearSessionRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the shared API connection pool"""
+    await rag_system.ai_generator.aclose()
+
+
 @app.on_event("startup")
 async def startup_event():
     """Load initial documents on startup"""
@@ -13,6 +13,15 @@ class Config:
     # Anthropic API settings
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
     ANTHROPIC_MODEL: str = "claude-sonnet-4-20250514"
+    # Optional service tier (e.g. "priority") for lower-latency inference
+    ANTHROPIC_SERVICE_TIER: str = os.getenv("ANTHROPIC_SERVICE_TIER", "")
+    # Opt-in response cache: reuses generated answers for repeated/similar
+    # queries (see response_cache.py). Off by default.
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
 
     # Embedding model settings
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
@@ -4,6 +4,7 @@ import re
 from document_processor import DocumentProcessor
 from vector_store import VectorStore
 from ai_generator import AIGenerator
+from response_cache import ResponseCache
 from session_manager import SessionManager
 from search_tools import ToolManager, CourseSearchTool, CourseOutlineTool
 from models import Course, Lesson, CourseChunk
@@ -23,7 +24,14 @@ class RAGSystem:
             config.CHROMA_PATH, config.EMBEDDING_MODEL, config.MAX_RESULTS
         )
         self.ai_generator = AIGenerator(
-            config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL
+            config.ANTHROPIC_API_KEY,
+            config.ANTHROPIC_MODEL,
+            response_cache=(
+                ResponseCache(config.EMBEDDING_MODEL)
+                if config.RESPONSE_CACHE_ENABLED
+                else None
+            ),
+            service_tier=config.ANTHROPIC_SERVICE_TIER or None,
         )
         self.session_manager = SessionManager(config.MAX_HISTORY)
 
@@ -31,8 +39,8 @@ class RAGSystem:
         self.tool_manager = ToolManager()
         self.search_tool = CourseSearchTool(self.vector_store)
         self.outline_tool = CourseOutlineTool(self.vector_store)
-        self.tool_manager.register_tool(self.search_tool)
-        self.tool_manager.register_tool(self.outline_tool)
+        self.tool_manager.register_tool(self.search_tool, can_memoize=True)
+        self.tool_manager.register_tool(self.outline_tool, can_memoize=True)
 
     def add_course_document(self, file_path: str) -> Tuple[Course, int]:
         """
@@ -56,6 +64,9 @@ class RAGSystem:
             # Add course content chunks to vector store
             self.vector_store.add_course_content(course_chunks)
 
+            # New material can change answers, so cached responses are stale
+            self._invalidate_response_cache()
+
             return course, len(course_chunks)
         except Exception as e:
             print(f"Error processing course document {file_path}: {e}")
@@ -117,8 +128,17 @@ class RAGSystem:
                 except Exception as e:
                     print(f"Error processing {file_name}: {e}")
 
+        # New material can change answers, so cached responses are stale
+        if total_courses or clear_existing:
+            self._invalidate_response_cache()
+
         return total_courses, total_chunks
 
+    def _invalidate_response_cache(self):
+        """Drop cached responses after the knowledge base changes"""
+        if self.ai_generator.response_cache:
+            self.ai_generator.response_cache.clear()
+
     def query(
         self, query: str, session_id: Optional[str] = None
     ) -> Tuple[str, List[str]]:
@@ -152,8 +172,9 @@ class RAGSystem:
         sources = self.tool_manager.get_last_sources()
         source_links = self.tool_manager.get_last_source_links()
 
-        # Reset sources after retrieving them
+        # Reset sources and memoized tool results after retrieving them
         self.tool_manager.reset_sources()
+        self.tool_manager.reset_memo_cache()
 
         # Update conversation history
         if session_id:
@@ -162,6 +183,144 @@ class RAGSystem:
         # Return response with sources and links from tool searches
         return response, sources, source_links
 
+    async def aquery(
+        self, query: str, session_id: Optional[str] = None
+    ) -> Tuple[str, List[str]]:
+        """
+        Async variant of query.
+
+        Awaits the generator's async path so the FastAPI event loop can
+        serve other requests during Claude wall-time.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Returns:
+            Tuple of (response, sources list, source_links list)
+        """
+        # Create prompt for the AI with clear instructions
+        prompt = f"""Answer this question about course materials: {query}"""
+
+        # Get conversation history if session exists
+        history = None
+        if session_id:
+            history = self.session_manager.get_conversation_history(session_id)
+
+        # Generate response using AI with tools
+        response = await self.ai_generator.agenerate_response(
+            query=prompt,
+            conversation_history=history,
+            tools=self.tool_manager.get_tool_definitions(),
+            tool_manager=self.tool_manager,
+        )
+
+        # Get sources and source links from the search tool
+        sources = self.tool_manager.get_last_sources()
+        source_links = self.tool_manager.get_last_source_links()
+
+        # Reset sources and memoized tool results after retrieving them
+        self.tool_manager.reset_sources()
+        self.tool_manager.reset_memo_cache()
+
+        # Update conversation history
+        if session_id:
+            self.session_manager.add_exchange(session_id, query, response)
+
+        # Return response with sources and links from tool searches
+        return response, sources, source_links
+
+    async def query_batch(
+        self, queries: List[str], use_search: bool = True
+    ) -> List[str]:
+        """
+        Process multiple independent queries in one pass.
+
+        With use_search=True each query runs the interactive tool loop,
+        gathered concurrently on the caller's event loop. With
+        use_search=False queries skip course search and go through the
+        discounted Message Batches API in a single submission. Sessions
+        are not supported - batch queries are one-shot by design.
+
+        Args:
+            queries: List of user questions
+            use_search: Whether queries may search course content
+
+        Returns:
+            List of responses in the same order as queries
+        """
+        items = []
+        for query in queries:
+            item = {
+                "query": f"""Answer this question about course materials: {query}""",
+            }
+            if use_search:
+                item["tools"] = self.tool_manager.get_tool_definitions()
+                item["tool_manager"] = self.tool_manager
+            items.append(item)
+
+        responses = await self.ai_generator.agenerate_responses_batch(items)
+
+        # Batch responses don't surface per-query sources; just clean up
+        self.tool_manager.reset_sources()
+        self.tool_manager.reset_memo_cache()
+
+        return responses
+
+    def query_stream(self, query: str, session_id: Optional[str] = None):
+        """
+        Streaming variant of query.
+
+        Yields {"delta": chunk} dicts as response text arrives, then a final
+        {"sources": [...], "source_links": [...]} dict once generation
+        completes. History and source bookkeeping match query().
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Yields:
+            Dicts with either a "delta" key or the final "sources" key
+        """
+        # Create prompt for the AI with clear instructions
+        prompt = f"""Answer this question about course materials: {query}"""
+
+        # Get conversation history if session exists
+        history = None
+        if session_id:
+            history = self.session_manager.get_conversation_history(session_id)
+
+        # Stream response text, accumulating it for history. Sources are
+        # captured inside the loop, in the same resumption whose tool round
+        # set them: Starlette drives sync generators through worker threads
+        # that resume each next() in a fresh context copy, so ContextVar
+        # state written during one resumption is gone by the next
+        chunks = []
+        sources: List[str] = []
+        source_links: List[Optional[str]] = []
+        for chunk in self.ai_generator.generate_response_stream(
+            query=prompt,
+            conversation_history=history,
+            tools=self.tool_manager.get_tool_definitions(),
+            tool_manager=self.tool_manager,
+        ):
+            if not chunks:
+                # Tool rounds finish before the first chunk streams, so the
+                # sources are complete here - and this is the last point
+                # they're reliably visible
+                sources = self.tool_manager.get_last_sources()
+                source_links = self.tool_manager.get_last_source_links()
+                self.tool_manager.reset_sources()
+                self.tool_manager.reset_memo_cache()
+            chunks.append(chunk)
+            yield {"delta": chunk}
+
+        # Update conversation history with the full response
+        if session_id:
+            self.session_manager.add_exchange(session_id, query, "".join(chunks))
+
+        yield {"sources": sources, "source_links": source_links}
+
     def get_course_analytics(self) -> Dict:
         """Get analytics about the course catalog"""
         return {
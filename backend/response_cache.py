@@ -0,0 +1,153 @@
+import hashlib
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class ResponseCache:
+    """Caches generated responses to skip Anthropic round-trips for repeats.
+
+    Lookups run in two tiers:
+    1. Exact: SHA256 signature of the normalized query plus a hash of the
+       conversation history and tool definitions.
+    2. Semantic: the normalized query is embedded with the same sentence
+       transformer used for retrieval and compared against stored queries
+       by cosine similarity, within the same history/tools context.
+
+    Entries are held in-memory (like SessionManager) and expire after a TTL.
+    """
+
+    def __init__(
+        self,
+        embedding_model: str = "all-MiniLM-L6-v2",
+        similarity_threshold: float = 0.85,
+        ttl_seconds: int = 86400,
+    ):
+        self.embedding_model = embedding_model
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+
+        # exact signature -> (response, stored_at)
+        self._exact: Dict[str, Tuple[Any, float]] = {}
+        # (embedding, context_hash, response, stored_at) per cached query
+        self._semantic: List[Tuple[np.ndarray, str, Any, float]] = []
+        self._encoder = None  # Loaded lazily on first semantic lookup
+        # Hash of the bound generation params, mixed into every signature
+        self._request_params_hash = ""
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        """Normalize a query: lowercase, strip punctuation, collapse whitespace"""
+        normalized = re.sub(r"[^\w\s]", "", query.lower())
+        return re.sub(r"\s+", " ", normalized).strip()
+
+    def bind_request_params(self, params: Dict[str, Any]):
+        """
+        Mix generation parameters into every cache signature.
+
+        Canonicalized with sorted keys, so a model, prompt, or sampling
+        change deterministically partitions the cache and can never serve
+        responses produced under a different configuration.
+        """
+        self._request_params_hash = hashlib.md5(
+            json.dumps(params, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def _context_hash(self, history: Optional[str], tools: Optional[List]) -> str:
+        """Hash the conversation/tools context so hits require identical context"""
+        history_hash = hashlib.md5((history or "").encode("utf-8")).hexdigest()
+        tools_hash = hashlib.md5(
+            json.dumps(tools or [], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return f"{self._request_params_hash}:{history_hash}:{tools_hash}"
+
+    @staticmethod
+    def _signature(normalized_query: str, context: str) -> str:
+        return hashlib.sha256(f"{normalized_query}|{context}".encode("utf-8")).hexdigest()
+
+    def _embed(self, text: str) -> np.ndarray:
+        """Embed text, loading the sentence transformer on first use"""
+        if self._encoder is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._encoder = SentenceTransformer(self.embedding_model)
+        return np.asarray(self._encoder.encode([text])[0], dtype=np.float32)
+
+    def lookup(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+    ) -> Optional[Any]:
+        """Return a cached response for this query/context, or None on miss"""
+        now = time.time()
+        normalized = self._normalize(query)
+        context = self._context_hash(conversation_history, tools)
+
+        # Tier 1: exact signature match
+        signature = self._signature(normalized, context)
+        entry = self._exact.get(signature)
+        if entry:
+            response, stored_at = entry
+            if now - stored_at <= self.ttl_seconds:
+                return response
+            del self._exact[signature]
+
+        # Tier 2: embedding similarity within the same context
+        candidates = [
+            (vector, response)
+            for vector, entry_context, response, stored_at in self._semantic
+            if entry_context == context and now - stored_at <= self.ttl_seconds
+        ]
+        if not candidates:
+            return None
+
+        query_vector = self._embed(normalized)
+        best_response = None
+        best_score = self.similarity_threshold
+        for vector, response in candidates:
+            denominator = np.linalg.norm(query_vector) * np.linalg.norm(vector)
+            if denominator == 0:
+                continue
+            score = float(np.dot(query_vector, vector) / denominator)
+            if score >= best_score:
+                best_score = score
+                best_response = response
+        return best_response
+
+    def update(
+        self,
+        query: str,
+        conversation_history: Optional[str],
+        tools: Optional[List],
+        response: Any,
+    ):
+        """Store a generated response under both exact and semantic keys.
+
+        The cached value is opaque to the cache - callers may store a plain
+        string or a richer payload (e.g. response plus tracked sources).
+        """
+        now = time.time()
+        normalized = self._normalize(query)
+        context = self._context_hash(conversation_history, tools)
+
+        self._exact[self._signature(normalized, context)] = (response, now)
+        self._semantic.append((self._embed(normalized), context, response, now))
+
+        # Drop expired entries so the in-memory store doesn't grow unbounded
+        self._exact = {
+            key: (resp, stored_at)
+            for key, (resp, stored_at) in self._exact.items()
+            if now - stored_at <= self.ttl_seconds
+        }
+        self._semantic = [
+            entry for entry in self._semantic if now - entry[3] <= self.ttl_seconds
+        ]
+
+    def clear(self):
+        """Drop every cached entry (called when the knowledge base changes)"""
+        self._exact.clear()
+        self._semantic.clear()
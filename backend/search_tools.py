@@ -1,7 +1,28 @@
+import contextvars
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import cached_property
 from typing import Dict, Any, Optional, Protocol
 from abc import ABC, abstractmethod
 from vector_store import VectorStore, SearchResults
 
+# Per-context source tracking so concurrent async requests sharing one
+# CourseSearchTool instance never see each other's sources
+_last_sources: ContextVar[Optional[list]] = ContextVar("last_sources", default=None)
+_last_source_links: ContextVar[Optional[list]] = ContextVar(
+    "last_source_links", default=None
+)
+
+# Memoized tool results, scoped per request context like the sources above.
+# An instance-wide dict would let one in-flight request serve another's
+# memo entry, skipping _format_results and leaving that request's
+# ContextVar sources empty.
+_tool_memo: ContextVar[Optional[Dict[tuple, str]]] = ContextVar(
+    "tool_memo", default=None
+)
+
 
 class Tool(ABC):
     """Abstract base class for all tools"""
@@ -24,8 +45,27 @@ class CourseSearchTool(Tool):
         self.store = vector_store
         self.last_sources = []  # Track sources from last search
 
-    def get_tool_definition(self) -> Dict[str, Any]:
-        """Return Anthropic tool definition for this tool"""
+    # Sources live in ContextVars (not instance attributes) so each asyncio
+    # task tracks its own; the property interface keeps callers unchanged
+    @property
+    def last_sources(self) -> list:
+        return _last_sources.get() or []
+
+    @last_sources.setter
+    def last_sources(self, value: list):
+        _last_sources.set(value)
+
+    @property
+    def last_source_links(self) -> list:
+        return _last_source_links.get() or []
+
+    @last_source_links.setter
+    def last_source_links(self, value: list):
+        _last_source_links.set(value)
+
+    @cached_property
+    def tool_definition(self) -> Dict[str, Any]:
+        """Anthropic tool definition, built once per instance"""
         return {
             "name": "search_course_content",
             "description": "Search course materials with smart course name matching and lesson filtering",
@@ -49,6 +89,10 @@ class CourseSearchTool(Tool):
             },
         }
 
+    def get_tool_definition(self) -> Dict[str, Any]:
+        """Return Anthropic tool definition for this tool"""
+        return self.tool_definition
+
     def execute(
         self,
         query: str,
@@ -131,8 +175,9 @@ class CourseOutlineTool(Tool):
     def __init__(self, vector_store: VectorStore):
         self.store = vector_store
 
-    def get_tool_definition(self) -> Dict[str, Any]:
-        """Return Anthropic tool definition for this tool"""
+    @cached_property
+    def tool_definition(self) -> Dict[str, Any]:
+        """Anthropic tool definition, built once per instance"""
         return {
             "name": "get_course_outline",
             "description": "Get the complete outline of a course including title, link, and all lessons with their numbers and titles",
@@ -148,6 +193,10 @@ class CourseOutlineTool(Tool):
             },
         }
 
+    def get_tool_definition(self) -> Dict[str, Any]:
+        """Return Anthropic tool definition for this tool"""
+        return self.tool_definition
+
     def execute(self, course_name: str) -> str:
         """
         Execute the outline retrieval tool.
@@ -205,25 +254,109 @@ class ToolManager:
 
     def __init__(self):
         self.tools = {}
+        self._memoizable: set = set()
+        self._definitions_cache: Optional[list] = None
 
-    def register_tool(self, tool: Tool):
-        """Register any tool that implements the Tool interface"""
+    def register_tool(self, tool: Tool, can_memoize: bool = False):
+        """
+        Register any tool that implements the Tool interface.
+
+        Args:
+            tool: The tool to register
+            can_memoize: Mark read-only tools whose results can be reused
+                for identical arguments (skip for side-effectful tools)
+        """
         tool_def = tool.get_tool_definition()
         tool_name = tool_def.get("name")
         if not tool_name:
             raise ValueError("Tool must have a 'name' in its definition")
         self.tools[tool_name] = tool
+        if can_memoize:
+            self._memoizable.add(tool_name)
+        self._definitions_cache = None
 
     def get_tool_definitions(self) -> list:
-        """Get all tool definitions for Anthropic tool calling"""
-        return [tool.get_tool_definition() for tool in self.tools.values()]
+        """Get all tool definitions for Anthropic tool calling.
+
+        Definitions are static after registration, so the list is built once
+        and reused - returning the same object every query also lets
+        downstream identity-keyed caches (AIGenerator's tools memo) hit.
+        """
+        if self._definitions_cache is None:
+            self._definitions_cache = [
+                tool.get_tool_definition() for tool in self.tools.values()
+            ]
+        return self._definitions_cache
 
     def execute_tool(self, tool_name: str, **kwargs) -> str:
-        """Execute a tool by name with given parameters"""
+        """Execute a tool by name with given parameters.
+
+        Repeated identical calls to memoizable tools (Claude often re-issues
+        the same search across rounds) return the cached result instead of
+        hitting the vector store again. Only successes are cached, and the
+        memo lives in a per-request ContextVar so concurrent requests never
+        serve each other's entries.
+        """
         if tool_name not in self.tools:
             return f"Tool '{tool_name}' not found"
 
-        return self.tools[tool_name].execute(**kwargs)
+        memo = None
+        memo_key = None
+        if tool_name in self._memoizable:
+            memo_key = (
+                tool_name,
+                hashlib.sha256(
+                    json.dumps(kwargs, sort_keys=True, default=str).encode("utf-8")
+                ).hexdigest(),
+            )
+            memo = _tool_memo.get()
+            if memo is None:
+                memo = {}
+                _tool_memo.set(memo)
+            elif memo_key in memo:
+                return memo[memo_key]
+
+        result = self.tools[tool_name].execute(**kwargs)
+
+        if memo_key is not None:
+            memo[memo_key] = result
+        return result
+
+    def execute_tool_batch(self, calls: list, max_workers: int = 4) -> list:
+        """
+        Execute a list of (tool_name, kwargs) calls in one pass.
+
+        Calls dispatch concurrently since tool work is I/O-bound (vector
+        store + embedding); results come back in call order. Memoization
+        applies per call as usual: each worker runs in a copy of the
+        caller's context whose updates (memo entries, tracked sources) are
+        merged back afterwards, so per-request ContextVar state survives
+        the thread hop.
+        """
+        if len(calls) <= 1:
+            return [self.execute_tool(name, **kwargs) for name, kwargs in calls]
+
+        contexts = [contextvars.copy_context() for _ in calls]
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(calls))
+        ) as executor:
+            futures = [
+                executor.submit(ctx.run, self.execute_tool, name, **kwargs)
+                for ctx, (name, kwargs) in zip(contexts, calls)
+            ]
+            results = [future.result() for future in futures]
+        for ctx in contexts:
+            for var, value in ctx.items():
+                var.set(value)
+        return results
+
+    def reset_memo_cache(self):
+        """Drop this context's memoized tool results (called at query boundaries).
+
+        Rebinds the ContextVar rather than clearing the dict in place, so a
+        dict still referenced from another context is left untouched.
+        """
+        _tool_memo.set(None)
 
     def get_last_sources(self) -> list:
         """Get sources from the last search operation"""
@@ -1,13 +1,7 @@
-import sys
-import os
-
-# Add backend and tests directories to path so imports work
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
-sys.path.insert(0, os.path.dirname(__file__))
-
 import pytest
-from unittest.mock import MagicMock, patch
-from helpers import MockConfig, make_valid_search_results
+from unittest.mock import AsyncMock, MagicMock, create_autospec, patch
+from helpers import MockConfig, make_valid_search_results, wire_rag_defaults
+from vector_store import VectorStore
 
 
 @pytest.fixture
@@ -19,24 +13,19 @@ def mock_config():
 @pytest.fixture
 def mock_rag_system():
     """A MagicMock standing in for RAGSystem with pre-wired sub-components."""
-    rag = MagicMock()
-    rag.session_manager.create_session.return_value = "test-session-123"
-    rag.query.return_value = (
-        "This is a test answer.",
-        ["Source A", "Source B"],
-        ["http://example.com/a", "http://example.com/b"],
-    )
-    rag.get_course_analytics.return_value = {
-        "total_courses": 2,
-        "course_titles": ["Course A", "Course B"],
-    }
-    return rag
+    return wire_rag_defaults(MagicMock())
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_vector_store():
-    """A MagicMock standing in for VectorStore."""
-    store = MagicMock()
+    """An autospecced VectorStore mock.
+
+    create_autospec keeps the attribute surface fixed to the real class
+    (no child-mock autogeneration, signature mismatches fail loudly) and
+    spec_set also rejects assigning attributes the class doesn't have;
+    module scope avoids rebuilding it per test.
+    """
+    store = create_autospec(VectorStore, instance=True, spec_set=True)
     store.get_course_count.return_value = 2
     store.get_existing_course_titles.return_value = ["Course A", "Course B"]
     store.search.return_value = make_valid_search_results(2)
@@ -1,20 +1,24 @@
 """Shared test helpers and factories."""
 
-import sys
-import os
-from dataclasses import dataclass
-from unittest.mock import MagicMock
-
-# Add backend to path so imports work
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import json
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+from unittest.mock import AsyncMock
 
 from vector_store import SearchResults
 
+_CASSETTE_PATH = Path(__file__).parent / "cassettes" / "search_results.json"
+
 
 @dataclass
 class MockConfig:
     ANTHROPIC_API_KEY: str = "test-key"
     ANTHROPIC_MODEL: str = "claude-sonnet-4-20250514"
+    ANTHROPIC_SERVICE_TIER: str = ""
+    RESPONSE_CACHE_ENABLED: bool = False
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     CHUNK_SIZE: int = 800
     CHUNK_OVERLAP: int = 100
@@ -23,6 +27,27 @@ class MockConfig:
     CHROMA_PATH: str = "./test_chroma_db"
 
 
+def wire_rag_defaults(rag):
+    """(Re)apply default return values to a mock RAGSystem.
+
+    Shared between the conftest fixture and module-scoped fixtures that
+    reset the mock between tests.
+    """
+    rag.session_manager.create_session.return_value = "test-session-123"
+    rag.query.return_value = (
+        "This is a test answer.",
+        ["Source A", "Source B"],
+        ["http://example.com/a", "http://example.com/b"],
+    )
+    rag.aquery = AsyncMock(return_value=rag.query.return_value)
+    rag.query_batch = AsyncMock(return_value=[])
+    rag.get_course_analytics.return_value = {
+        "total_courses": 2,
+        "course_titles": ["Course A", "Course B"],
+    }
+    return rag
+
+
 def make_search_results(documents=None, metadata=None, distances=None, error=None):
     """Factory for SearchResults objects."""
     if error:
@@ -35,8 +60,13 @@ def make_search_results(documents=None, metadata=None, distances=None, error=Non
     )
 
 
+@lru_cache(maxsize=None)
 def make_valid_search_results(n=2):
-    """Create valid search results with n items."""
+    """Create valid search results with n items.
+
+    Cached per n - tests only read the returned SearchResults, so one
+    allocation per distinct shape serves the whole run.
+    """
     docs = [f"Content about topic {i}" for i in range(n)]
     meta = [
         {"course_title": f"Course {i}", "lesson_number": i + 1, "chunk_index": i}
@@ -46,22 +76,181 @@ def make_valid_search_results(n=2):
     return SearchResults(documents=docs, metadata=meta, distances=dists)
 
 
+@lru_cache(maxsize=1)
+def _load_search_cassette():
+    with open(_CASSETTE_PATH) as f:
+        return json.load(f)
+
+
+def cassette_search(**kwargs):
+    """Replay a recorded VectorStore.search result (VCR-style).
+
+    Results live in cassettes/search_results.json keyed by the canonical
+    JSON of the call kwargs; use as a side_effect on a store stub. Raises
+    KeyError for calls that were never recorded.
+    """
+    entry = _load_search_cassette()[json.dumps(kwargs, sort_keys=True, default=str)]
+    return SearchResults(**entry)
+
+
+def assert_has_sources(tool, *expected):
+    """Assert the tool tracked every expected source.
+
+    Builds the set once so membership stays O(1) per expected source as
+    parametrized tables grow.
+    """
+    got = set(tool.last_sources)
+    missing = [source for source in expected if source not in got]
+    assert not missing, f"missing sources: {missing} (tracked: {sorted(got)})"
+
+
+class RecordingStub:
+    """Minimal callable stand-in for one mocked method.
+
+    Supports the slice of the Mock API the tests actually use
+    (return_value, side_effect, call assertions) without MagicMock's
+    per-call _Call bookkeeping.
+    """
+
+    def __init__(self, return_value=None):
+        self.return_value = return_value
+        self.side_effect = None
+        self.call_args = None
+        self.call_count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        # Locked so concurrent dispatch (execute_tool_batch) counts reliably
+        with self._lock:
+            self.call_count += 1
+            self.call_args = (args, kwargs)
+        if isinstance(self.side_effect, BaseException):
+            raise self.side_effect
+        if self.side_effect is not None:
+            return self.side_effect(*args, **kwargs)
+        return self.return_value
+
+    def assert_called_once(self):
+        assert self.call_count == 1, f"expected 1 call, got {self.call_count}"
+
+    def assert_called_once_with(self, *args, **kwargs):
+        self.assert_called_once()
+        assert self.call_args == (args, kwargs), (
+            f"called with {self.call_args}, expected {(args, kwargs)}"
+        )
+
+
+class FakeStore:
+    """Hand-written VectorStore stand-in for the search tool tests.
+
+    Exposes only the methods the tools touch, each backed by a
+    RecordingStub - no child-mock autogeneration or proxy dispatch on the
+    hot store.search() path.
+    """
+
+    def __init__(self):
+        self.search = RecordingStub()
+
+    # No test asserts on get_lesson_link calls, so a plain method beats
+    # paying call bookkeeping for a constant
+    @staticmethod
+    def get_lesson_link(course_title, lesson_number):
+        return "https://example.com/lesson"
+
+    def reset_mock(self, return_value=False, side_effect=False):
+        self.search.call_args = None
+        self.search.call_count = 0
+        if return_value:
+            self.search.return_value = None
+        if side_effect:
+            self.search.side_effect = None
+
+
+class StubToolManager:
+    """Hand-rolled tool manager stub for generator hot-path tests.
+
+    Cheaper than MagicMock (no child-mock creation or call-object
+    bookkeeping per access) and failed assertions read as plain tuple
+    comparisons. Records calls as (name, kwargs) tuples; side_effect
+    accepts an exception instance or a sequence of results/exceptions.
+    """
+
+    def __init__(self, return_value="Tool result: content about topic"):
+        self.calls = []
+        self.return_value = return_value
+        self._side_effect = None
+        self._side_effect_iter = None
+
+    @property
+    def side_effect(self):
+        return self._side_effect
+
+    @side_effect.setter
+    def side_effect(self, value):
+        self._side_effect = value
+        self._side_effect_iter = (
+            iter(value)
+            if value is not None and not isinstance(value, BaseException)
+            else None
+        )
+
+    def execute_tool(self, name, **kwargs):
+        self.calls.append((name, kwargs))
+        if isinstance(self._side_effect, BaseException):
+            raise self._side_effect
+        if self._side_effect_iter is not None:
+            value = next(self._side_effect_iter)
+            if isinstance(value, BaseException):
+                raise value
+            return value
+        return self.return_value
+
+
+@dataclass
+class FakeBlock:
+    """Plain stand-in for an Anthropic content block (text or tool_use)."""
+
+    type: str
+    text: Optional[str] = None
+    id: Optional[str] = None
+    name: Optional[str] = None
+    input: Optional[dict] = None
+
+
+@dataclass
+class FakeResponse:
+    """Plain stand-in for an Anthropic API response."""
+
+    content: List[FakeBlock] = field(default_factory=list)
+    stop_reason: str = "end_turn"
+
+
+@lru_cache(maxsize=256)
+def _cached_blocks(signature: str) -> tuple:
+    """Build FakeBlocks once per distinct content signature.
+
+    Tests reuse the same handful of block payloads hundreds of times; the
+    blocks are never mutated, so sharing them across responses is safe.
+    """
+    return tuple(
+        FakeBlock(
+            type=block["type"],
+            text=block.get("text"),
+            id=block.get("id"),
+            name=block.get("name"),
+            input=block.get("input"),
+        )
+        for block in json.loads(signature)
+    )
+
+
 def make_anthropic_response(content_blocks, stop_reason="end_turn"):
-    """Factory for mock Anthropic API responses."""
-    mock_response = MagicMock()
-    mock_response.stop_reason = stop_reason
-
-    blocks = []
-    for block in content_blocks:
-        mock_block = MagicMock()
-        mock_block.type = block["type"]
-        if block["type"] == "text":
-            mock_block.text = block["text"]
-        elif block["type"] == "tool_use":
-            mock_block.id = block["id"]
-            mock_block.name = block["name"]
-            mock_block.input = block["input"]
-        blocks.append(mock_block)
-
-    mock_response.content = blocks
-    return mock_response
+    """Factory for fake Anthropic API responses.
+
+    Uses plain dataclasses rather than MagicMock - far cheaper to construct
+    and attribute typos fail loudly instead of auto-generating mocks. The
+    response itself is fresh per call (some tests reassign .content); only
+    the immutable blocks are cached.
+    """
+    blocks = _cached_blocks(json.dumps(content_blocks, sort_keys=True))
+    return FakeResponse(content=list(blocks), stop_reason=stop_reason)
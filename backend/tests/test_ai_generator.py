@@ -1,9 +1,10 @@
 """Tests for AIGenerator tool calling and response handling."""
 
+import asyncio
 import pytest
 import anthropic
-from unittest.mock import MagicMock, patch, call
-from helpers import make_anthropic_response
+from unittest.mock import AsyncMock, MagicMock, patch, call
+from helpers import StubToolManager, make_anthropic_response
 from ai_generator import AIGenerator
 
 
@@ -16,9 +17,7 @@ def generator():
 
 @pytest.fixture
 def tool_manager():
-    tm = MagicMock()
-    tm.execute_tool.return_value = "Tool result: content about topic"
-    return tm
+    return StubToolManager()
 
 
 @pytest.fixture
@@ -89,9 +88,9 @@ class TestSingleToolRound:
             tool_manager=tool_manager,
         )
 
-        tool_manager.execute_tool.assert_called_once_with(
-            "search_course_content", query="neural networks"
-        )
+        assert tool_manager.calls == [
+            ("search_course_content", {"query": "neural networks"})
+        ]
 
     def test_tool_use_then_synthesis(self, generator, tool_manager, sample_tools):
         """Round 1: tool_use -> execute -> Round 2: Claude synthesizes answer."""
@@ -129,7 +128,7 @@ class TestSingleToolRound:
     ):
         """get_course_outline tool result is returned directly without synthesis."""
         outline_result = "**Course Title:** MCP\n- Lesson 1: Intro"
-        tool_manager.execute_tool.return_value = outline_result
+        tool_manager.return_value = outline_result
 
         tool_response = make_anthropic_response(
             [
@@ -154,6 +153,105 @@ class TestSingleToolRound:
         # Should NOT make a second API call for synthesis
         assert generator.client.messages.create.call_count == 1
 
+    def test_outline_failure_falls_back_to_synthesis(
+        self, generator, tool_manager, sample_tools
+    ):
+        """A failing direct-return tool still ends with a synthesis call."""
+        tool_manager.side_effect = RuntimeError("catalog unavailable")
+
+        tool_response = make_anthropic_response(
+            [
+                {
+                    "type": "tool_use",
+                    "id": "t1",
+                    "name": "get_course_outline",
+                    "input": {"course_name": "MCP"},
+                }
+            ],
+            stop_reason="tool_use",
+        )
+        final_response = make_anthropic_response(
+            [{"type": "text", "text": "I couldn't retrieve the outline."}],
+            stop_reason="end_turn",
+        )
+        generator.client.messages.create.side_effect = [tool_response, final_response]
+
+        result = generator.generate_response(
+            query="outline of MCP",
+            tools=sample_tools,
+            tool_manager=tool_manager,
+        )
+
+        assert result == "I couldn't retrieve the outline."
+        assert generator.client.messages.create.call_count == 2
+
+    def test_empty_search_results_skip_synthesis(
+        self, generator, tool_manager, sample_tools
+    ):
+        """All-empty tool results return the canned response with no extra call."""
+        tool_manager.return_value = "No relevant content found."
+
+        tool_response = make_anthropic_response(
+            [
+                {
+                    "type": "tool_use",
+                    "id": "t1",
+                    "name": "search_course_content",
+                    "input": {"query": "nonexistent topic"},
+                }
+            ],
+            stop_reason="tool_use",
+        )
+        generator.client.messages.create.return_value = tool_response
+
+        result = generator.generate_response(
+            query="nonexistent topic",
+            tools=sample_tools,
+            tool_manager=tool_manager,
+        )
+
+        assert result == AIGenerator.NO_RESULT_RESPONSE
+        assert generator.client.messages.create.call_count == 1
+
+    def test_duplicate_parallel_tool_calls_execute_once(
+        self, generator, tool_manager, sample_tools
+    ):
+        """Identical parallel tool_use blocks share one execution."""
+        tool_manager.return_value = "Result text"
+
+        tool_response = make_anthropic_response(
+            [
+                {
+                    "type": "tool_use",
+                    "id": "t1",
+                    "name": "search_course_content",
+                    "input": {"query": "same"},
+                },
+                {
+                    "type": "tool_use",
+                    "id": "t2",
+                    "name": "search_course_content",
+                    "input": {"query": "same"},
+                },
+            ],
+            stop_reason="tool_use",
+        )
+        final_response = make_anthropic_response(
+            [{"type": "text", "text": "Done."}], stop_reason="end_turn"
+        )
+        generator.client.messages.create.side_effect = [tool_response, final_response]
+
+        result = generator.generate_response(
+            query="q", tools=sample_tools, tool_manager=tool_manager
+        )
+
+        assert result == "Done."
+        assert tool_manager.calls == [("search_course_content", {"query": "same"})]
+        # Both tool_use ids still receive a tool_result block
+        second_call = generator.client.messages.create.call_args_list[1]
+        tool_results = second_call.kwargs["messages"][-1]["content"]
+        assert {r["tool_use_id"] for r in tool_results} == {"t1", "t2"}
+
 
 class TestMultiRoundToolCalling:
     def test_two_rounds_of_tool_calls(self, generator, tool_manager, sample_tools):
@@ -199,13 +297,13 @@ class TestMultiRoundToolCalling:
         assert result == "Final answer after 2 rounds."
         # 2 tool rounds + 1 final synthesis = 3 API calls
         assert generator.client.messages.create.call_count == 3
-        assert tool_manager.execute_tool.call_count == 2
+        assert len(tool_manager.calls) == 2
 
     def test_messages_accumulate_across_rounds(
         self, generator, tool_manager, sample_tools
     ):
         """2nd API call's messages kwarg contains tool results from round 1."""
-        tool_manager.execute_tool.return_value = "Result from round 1"
+        tool_manager.return_value = "Result from round 1"
 
         tool_response_1 = make_anthropic_response(
             [
@@ -248,11 +346,50 @@ class TestMultiRoundToolCalling:
         assert tool_result_content[0]["type"] == "tool_result"
         assert tool_result_content[0]["content"] == "Result from round 1"
 
+    def test_large_tool_results_compacted_before_next_round(
+        self, generator, tool_manager, sample_tools
+    ):
+        """Oversized tool output is truncated before round 2 re-sends it."""
+        tool_manager.return_value = "x" * 5000
+
+        tool_response = make_anthropic_response(
+            [
+                {
+                    "type": "tool_use",
+                    "id": "t1",
+                    "name": "search_course_content",
+                    "input": {"query": "big topic"},
+                }
+            ],
+            stop_reason="tool_use",
+        )
+        text_response = make_anthropic_response(
+            [{"type": "text", "text": "Summarized answer."}],
+            stop_reason="end_turn",
+        )
+        generator.client.messages.create.side_effect = [
+            tool_response,
+            text_response,
+        ]
+
+        generator.generate_response(
+            query="test query",
+            tools=sample_tools,
+            tool_manager=tool_manager,
+        )
+
+        second_call_msgs = generator.client.messages.create.call_args_list[1][1][
+            "messages"
+        ]
+        tool_result_content = second_call_msgs[-1]["content"][0]["content"]
+        assert tool_result_content.endswith("…[truncated]")
+        assert len(tool_result_content) < 1000
+
     def test_parallel_tool_calls_all_executed(
         self, generator, tool_manager, sample_tools
     ):
         """When Claude calls 2 tools in one response, both execute."""
-        tool_manager.execute_tool.side_effect = ["Result A", "Result B"]
+        tool_manager.side_effect = ["Result A", "Result B"]
 
         parallel_response = make_anthropic_response(
             [
@@ -287,13 +424,9 @@ class TestMultiRoundToolCalling:
         )
 
         assert result == "Combined answer."
-        assert tool_manager.execute_tool.call_count == 2
-        tool_manager.execute_tool.assert_any_call(
-            "search_course_content", query="topic A"
-        )
-        tool_manager.execute_tool.assert_any_call(
-            "search_course_content", query="topic B"
-        )
+        assert len(tool_manager.calls) == 2
+        assert ("search_course_content", {"query": "topic A"}) in tool_manager.calls
+        assert ("search_course_content", {"query": "topic B"}) in tool_manager.calls
 
         # Verify both results sent back to API
         second_call_msgs = generator.client.messages.create.call_args_list[1][1][
@@ -308,7 +441,7 @@ class TestMultiRoundToolCalling:
         self, generator, tool_manager, sample_tools
     ):
         """One tool fails -> error sent for that tool, successful result still included."""
-        tool_manager.execute_tool.side_effect = [
+        tool_manager.side_effect = [
             "Success result",
             RuntimeError("Tool B crashed"),
         ]
@@ -347,7 +480,7 @@ class TestMultiRoundToolCalling:
 
         assert isinstance(result, str)
         # Both tools were attempted
-        assert tool_manager.execute_tool.call_count == 2
+        assert len(tool_manager.calls) == 2
 
         # Verify both results (success + error) sent back to API
         second_call_msgs = generator.client.messages.create.call_args_list[1][1][
@@ -363,12 +496,261 @@ class TestMultiRoundToolCalling:
         assert tool_results_msg[1]["is_error"] is True
 
 
+class TestBatchGeneration:
+    def test_no_tool_items_use_batches_api(self, generator):
+        """Tool-free queries go through one Message Batches request."""
+        batch = MagicMock()
+        batch.id = "batch-1"
+        batch.processing_status = "ended"
+        generator.client.messages.batches.create.return_value = batch
+
+        entries = []
+        for index, text in enumerate(["Answer one.", "Answer two."]):
+            entry = MagicMock()
+            entry.custom_id = f"query-{index}"
+            entry.result.type = "succeeded"
+            entry.result.message = make_anthropic_response(
+                [{"type": "text", "text": text}]
+            )
+            entries.append(entry)
+        generator.client.messages.batches.results.return_value = iter(entries)
+
+        results = generator.generate_responses_batch(
+            [{"query": "first question"}, {"query": "second question"}]
+        )
+
+        assert results == ["Answer one.", "Answer two."]
+        generator.client.messages.batches.create.assert_called_once()
+        generator.client.messages.create.assert_not_called()
+
+    def test_batch_params_exclude_sdk_kwargs(self):
+        """extra_headers/extra_body never leak into batch request params."""
+        with patch("ai_generator.anthropic.Anthropic"):
+            generator = AIGenerator(
+                api_key="test-key",
+                model="claude-sonnet-4-20250514",
+                service_tier="priority",
+            )
+        batch = MagicMock()
+        batch.id = "batch-1"
+        batch.processing_status = "ended"
+        generator.client.messages.batches.create.return_value = batch
+        entry = MagicMock()
+        entry.custom_id = "query-0"
+        entry.result.type = "succeeded"
+        entry.result.message = make_anthropic_response([{"type": "text", "text": "ok"}])
+        generator.client.messages.batches.results.return_value = iter([entry])
+
+        generator.generate_responses_batch([{"query": "first question"}])
+
+        request = generator.client.messages.batches.create.call_args.kwargs[
+            "requests"
+        ][0]
+        assert "extra_headers" not in request["params"]
+        assert "extra_body" not in request["params"]
+
+    def test_poll_deadline_cancels_stuck_batch(self, generator):
+        """A batch that never finishes is cancelled once the deadline passes."""
+        batch = MagicMock()
+        batch.id = "batch-1"
+        batch.processing_status = "in_progress"
+        generator.client.messages.batches.create.return_value = batch
+        generator.BATCH_POLL_TIMEOUT = 0.0
+
+        with pytest.raises(RuntimeError, match="did not finish"):
+            generator.generate_responses_batch([{"query": "slow question"}])
+
+        generator.client.messages.batches.cancel.assert_called_once_with("batch-1")
+
+    def test_tool_items_run_interactive_loop(
+        self, generator, tool_manager, sample_tools
+    ):
+        """Items carrying tools run the interactive loop on the sync client."""
+        response = make_anthropic_response(
+            [{"type": "text", "text": "Tool-path answer."}],
+            stop_reason="end_turn",
+        )
+        generator.client.messages.create.return_value = response
+
+        results = generator.generate_responses_batch(
+            [
+                {
+                    "query": "needs tools",
+                    "tools": sample_tools,
+                    "tool_manager": tool_manager,
+                }
+            ]
+        )
+
+        assert results == ["Tool-path answer."]
+        generator.client.messages.batches.create.assert_not_called()
+
+    def test_async_batch_gathers_tool_items_on_running_loop(
+        self, generator, tool_manager, sample_tools
+    ):
+        """agenerate_responses_batch runs tool items via the async client."""
+        response = make_anthropic_response(
+            [{"type": "text", "text": "Tool-path answer."}],
+            stop_reason="end_turn",
+        )
+        generator.aclient = MagicMock()
+        generator.aclient.messages.create = AsyncMock(return_value=response)
+
+        results = asyncio.run(
+            generator.agenerate_responses_batch(
+                [
+                    {
+                        "query": "needs tools",
+                        "tools": sample_tools,
+                        "tool_manager": tool_manager,
+                    },
+                    {
+                        "query": "also needs tools",
+                        "tools": sample_tools,
+                        "tool_manager": tool_manager,
+                    },
+                ]
+            )
+        )
+
+        assert results == ["Tool-path answer.", "Tool-path answer."]
+        generator.client.messages.batches.create.assert_not_called()
+        generator.client.messages.create.assert_not_called()
+
+
+class TestStreamingGeneration:
+    def test_stream_without_tools_yields_chunks(self, generator):
+        """The no-tools path streams text deltas straight from the API."""
+        stream_cm = MagicMock()
+        stream_cm.__enter__.return_value.text_stream = iter(["Hello", " world"])
+        generator.client.messages.stream.return_value = stream_cm
+
+        chunks = list(generator.generate_response_stream(query="hi"))
+
+        assert chunks == ["Hello", " world"]
+        generator.client.messages.create.assert_not_called()
+
+    def test_tool_round_then_streamed_synthesis(
+        self, generator, tool_manager, sample_tools
+    ):
+        """Tool rounds stay non-streaming; the final synthesis call streams."""
+        tool_response = make_anthropic_response(
+            [
+                {
+                    "type": "tool_use",
+                    "id": "t1",
+                    "name": "search_course_content",
+                    "input": {"query": "round 1"},
+                }
+            ],
+            stop_reason="tool_use",
+        )
+        tool_response_2 = make_anthropic_response(
+            [
+                {
+                    "type": "tool_use",
+                    "id": "t2",
+                    "name": "search_course_content",
+                    "input": {"query": "round 2"},
+                }
+            ],
+            stop_reason="tool_use",
+        )
+        generator.client.messages.create.side_effect = [
+            tool_response,
+            tool_response_2,
+        ]
+        stream_cm = MagicMock()
+        stream_cm.__enter__.return_value.text_stream = iter(["Final ", "answer."])
+        generator.client.messages.stream.return_value = stream_cm
+
+        chunks = list(
+            generator.generate_response_stream(
+                query="complex question",
+                tools=sample_tools,
+                tool_manager=tool_manager,
+            )
+        )
+
+        assert "".join(chunks) == "Final answer."
+        # 2 non-streaming tool rounds, then 1 streaming synthesis call
+        assert generator.client.messages.create.call_count == 2
+        generator.client.messages.stream.assert_called_once()
+
+
+class TestAsyncGeneration:
+    def test_async_direct_text_response(self, generator, sample_tools):
+        """agenerate_response returns text directly when no tools are used."""
+        response = make_anthropic_response(
+            [{"type": "text", "text": "Async hello!"}],
+            stop_reason="end_turn",
+        )
+        generator.aclient = MagicMock()
+        generator.aclient.messages.create = AsyncMock(return_value=response)
+
+        result = asyncio.run(
+            generator.agenerate_response(query="hi", tools=sample_tools)
+        )
+
+        assert result == "Async hello!"
+
+    def test_async_parallel_tools_all_executed(
+        self, generator, tool_manager, sample_tools
+    ):
+        """Multiple tool_use blocks execute concurrently and all results return."""
+        tool_manager.side_effect = ["Result A", "Result B"]
+
+        parallel_response = make_anthropic_response(
+            [
+                {
+                    "type": "tool_use",
+                    "id": "t1",
+                    "name": "search_course_content",
+                    "input": {"query": "topic A"},
+                },
+                {
+                    "type": "tool_use",
+                    "id": "t2",
+                    "name": "search_course_content",
+                    "input": {"query": "topic B"},
+                },
+            ],
+            stop_reason="tool_use",
+        )
+        synthesis_response = make_anthropic_response(
+            [{"type": "text", "text": "Combined async answer."}],
+            stop_reason="end_turn",
+        )
+        generator.aclient = MagicMock()
+        generator.aclient.messages.create = AsyncMock(
+            side_effect=[parallel_response, synthesis_response]
+        )
+
+        result = asyncio.run(
+            generator.agenerate_response(
+                query="compare topics",
+                tools=sample_tools,
+                tool_manager=tool_manager,
+            )
+        )
+
+        assert result == "Combined async answer."
+        assert len(tool_manager.calls) == 2
+
+        # Both results (in request order) sent back to the API
+        second_call_msgs = generator.aclient.messages.create.call_args_list[1][1][
+            "messages"
+        ]
+        tool_results_msg = second_call_msgs[-1]["content"]
+        assert [r["content"] for r in tool_results_msg] == ["Result A", "Result B"]
+
+
 class TestErrorHandling:
     def test_tool_execution_exception_handled(
         self, generator, tool_manager, sample_tools
     ):
         """When tool_manager raises, error is caught and loop breaks."""
-        tool_manager.execute_tool.side_effect = RuntimeError("Tool crashed")
+        tool_manager.side_effect = RuntimeError("Tool crashed")
 
         tool_response = make_anthropic_response(
             [
@@ -398,17 +780,39 @@ class TestErrorHandling:
         # The function should still return (error is handled in _handle_tool_execution)
         assert isinstance(result, str)
 
-    def test_api_exception_wrapped_as_runtime_error(self, generator, sample_tools):
-        """When client.messages.create() raises APIError, it's wrapped as RuntimeError with context."""
-        generator.client.messages.create.side_effect = anthropic.APIError(
-            message="rate limit exceeded",
-            request=MagicMock(),
+    def test_bad_request_wrapped_as_runtime_error(self, generator, sample_tools):
+        """Non-retryable BadRequestError is wrapped as RuntimeError with context."""
+        generator.client.messages.create.side_effect = anthropic.BadRequestError(
+            message="max_tokens must be positive",
+            response=MagicMock(status_code=400, headers={}),
+            body=None,
+        )
+
+        with pytest.raises(RuntimeError, match="Anthropic API error"):
+            generator.generate_response(query="test", tools=sample_tools)
+
+    def test_permission_denied_wrapped_as_runtime_error(self, generator, sample_tools):
+        """Non-retryable PermissionDeniedError is wrapped as RuntimeError."""
+        generator.client.messages.create.side_effect = anthropic.PermissionDeniedError(
+            message="forbidden",
+            response=MagicMock(status_code=403, headers={}),
             body=None,
         )
 
         with pytest.raises(RuntimeError, match="Anthropic API error"):
             generator.generate_response(query="test", tools=sample_tools)
 
+    def test_status_error_propagates_after_sdk_retries(self, generator, sample_tools):
+        """Errors surviving the SDK's built-in retries propagate unwrapped."""
+        generator.client.messages.create.side_effect = anthropic.RateLimitError(
+            message="rate limit exceeded",
+            response=MagicMock(status_code=429, headers={}),
+            body=None,
+        )
+
+        with pytest.raises(anthropic.RateLimitError):
+            generator.generate_response(query="test", tools=sample_tools)
+
     def test_auth_exception_wrapped_with_context(self, generator, sample_tools):
         """When client.messages.create() raises AuthenticationError, it's wrapped with auth context."""
         generator.client.messages.create.side_effect = anthropic.AuthenticationError(
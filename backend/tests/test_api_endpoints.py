@@ -5,9 +5,12 @@ doesn't exist in the test environment), we define a lightweight test app that
 mirrors the endpoint logic and wires in a mock RAGSystem.
 """
 
+import json
+
 import pytest
 from unittest.mock import MagicMock
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.testclient import TestClient
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Union
@@ -28,6 +31,15 @@ class QueryResponse(BaseModel):
     session_id: str
 
 
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    use_search: bool = True
+
+
+class BatchQueryResponse(BaseModel):
+    answers: List[str]
+
+
 class CourseStats(BaseModel):
     total_courses: int
     course_titles: List[str]
@@ -43,7 +55,7 @@ class ClearSessionRequest(BaseModel):
 
 def _create_test_app(rag_system: MagicMock) -> FastAPI:
     """Build a minimal FastAPI app with the same endpoints as production."""
-    test_app = FastAPI()
+    test_app = FastAPI(default_response_class=ORJSONResponse)
 
     @test_app.post("/api/query", response_model=QueryResponse)
     async def query_documents(request: QueryRequest):
@@ -51,11 +63,34 @@ def _create_test_app(rag_system: MagicMock) -> FastAPI:
             session_id = request.session_id
             if not session_id:
                 session_id = rag_system.session_manager.create_session()
-            answer, sources, _links = rag_system.query(request.query, session_id)
+            answer, sources, _links = await rag_system.aquery(request.query, session_id)
             return QueryResponse(answer=answer, sources=sources, session_id=session_id)
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
+    @test_app.post("/api/query/batch", response_model=BatchQueryResponse)
+    async def query_documents_batch(request: BatchQueryRequest):
+        try:
+            answers = await rag_system.query_batch(
+                request.queries, use_search=request.use_search
+            )
+            return BatchQueryResponse(answers=answers)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @test_app.post("/api/query/stream")
+    async def query_documents_stream(request: QueryRequest):
+        session_id = request.session_id
+        if not session_id:
+            session_id = rag_system.session_manager.create_session()
+
+        def event_stream():
+            for event in rag_system.query_stream(request.query, session_id):
+                yield f"data: {json.dumps(event)}\n\n"
+            yield f"data: {json.dumps({'session_id': session_id})}\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
     @test_app.get("/api/courses", response_model=CourseStats)
     async def get_course_stats():
         try:
@@ -81,14 +116,36 @@ def _create_test_app(rag_system: MagicMock) -> FastAPI:
 # ---------------------------------------------------------------------------
 # Fixtures
 # ---------------------------------------------------------------------------
+#
+# App construction and TestClient startup dominate this module's runtime, so
+# both are module-scoped; an autouse fixture resets the shared mock between
+# tests to keep them independent.
+
+@pytest.fixture(scope="module")
+def mock_rag_system():
+    """Module-scoped mock RAGSystem (overrides the conftest fixture)."""
+    from helpers import wire_rag_defaults
+
+    return wire_rag_defaults(MagicMock())
 
-@pytest.fixture
+
+@pytest.fixture(scope="module")
 def client(mock_rag_system):
     """TestClient wired to the mock RAG system."""
     app = _create_test_app(mock_rag_system)
     return TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def _reset_rag_between_tests(mock_rag_system):
+    """Clear call records and re-wire defaults after each test."""
+    from helpers import wire_rag_defaults
+
+    yield
+    mock_rag_system.reset_mock(return_value=True, side_effect=True)
+    wire_rag_defaults(mock_rag_system)
+
+
 # ---------------------------------------------------------------------------
 # /api/query
 # ---------------------------------------------------------------------------
@@ -101,7 +158,7 @@ class TestQueryEndpoint:
         assert data["answer"] == "This is a test answer."
         assert data["sources"] == ["Source A", "Source B"]
         assert data["session_id"] == "s1"
-        mock_rag_system.query.assert_called_once_with("What is RAG?", "s1")
+        mock_rag_system.aquery.assert_called_once_with("What is RAG?", "s1")
 
     def test_query_creates_session_when_missing(self, client, mock_rag_system):
         resp = client.post("/api/query", json={"query": "Hello"})
@@ -111,7 +168,7 @@ class TestQueryEndpoint:
         mock_rag_system.session_manager.create_session.assert_called_once()
 
     def test_query_returns_dict_sources(self, client, mock_rag_system):
-        mock_rag_system.query.return_value = (
+        mock_rag_system.aquery.return_value = (
             "Answer",
             [{"title": "Lesson 1", "link": "http://example.com"}],
             [],
@@ -120,17 +177,103 @@ class TestQueryEndpoint:
         assert resp.status_code == 200
         assert resp.json()["sources"] == [{"title": "Lesson 1", "link": "http://example.com"}]
 
+    def test_query_response_is_json(self, client):
+        """orjson-serialized responses keep the standard JSON content type."""
+        resp = client.post("/api/query", json={"query": "test"})
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "application/json"
+        assert resp.json()["answer"] == "This is a test answer."
+
     def test_query_missing_body_returns_422(self, client):
         resp = client.post("/api/query", json={})
         assert resp.status_code == 422
 
     def test_query_rag_error_returns_500(self, client, mock_rag_system):
-        mock_rag_system.query.side_effect = RuntimeError("boom")
+        mock_rag_system.aquery.side_effect = RuntimeError("boom")
         resp = client.post("/api/query", json={"query": "fail", "session_id": "s1"})
         assert resp.status_code == 500
         assert "boom" in resp.json()["detail"]
 
 
+# ---------------------------------------------------------------------------
+# /api/query/batch
+# ---------------------------------------------------------------------------
+
+class TestBatchQueryEndpoint:
+    def test_batch_returns_answers_in_order(self, client, mock_rag_system):
+        mock_rag_system.query_batch.return_value = ["Answer 1", "Answer 2"]
+        resp = client.post(
+            "/api/query/batch", json={"queries": ["What is RAG?", "What is MCP?"]}
+        )
+        assert resp.status_code == 200
+        assert resp.json()["answers"] == ["Answer 1", "Answer 2"]
+        mock_rag_system.query_batch.assert_called_once_with(
+            ["What is RAG?", "What is MCP?"], use_search=True
+        )
+
+    def test_batch_can_disable_search(self, client, mock_rag_system):
+        mock_rag_system.query_batch.return_value = ["Answer 1"]
+        resp = client.post(
+            "/api/query/batch", json={"queries": ["q"], "use_search": False}
+        )
+        assert resp.status_code == 200
+        mock_rag_system.query_batch.assert_called_once_with(["q"], use_search=False)
+
+    def test_batch_missing_queries_returns_422(self, client):
+        resp = client.post("/api/query/batch", json={})
+        assert resp.status_code == 422
+
+    def test_batch_error_returns_500(self, client, mock_rag_system):
+        mock_rag_system.query_batch.side_effect = RuntimeError("batch failed")
+        resp = client.post("/api/query/batch", json={"queries": ["q"]})
+        assert resp.status_code == 500
+        assert "batch failed" in resp.json()["detail"]
+
+
+# ---------------------------------------------------------------------------
+# /api/query/stream
+# ---------------------------------------------------------------------------
+
+class TestQueryStreamEndpoint:
+    @staticmethod
+    def _parse_sse(body: str) -> list:
+        """Parse 'data: {json}' frames into a list of dicts."""
+        return [
+            json.loads(line[len("data: "):])
+            for line in body.split("\n")
+            if line.startswith("data: ")
+        ]
+
+    def test_stream_yields_deltas_then_sources(self, client, mock_rag_system):
+        mock_rag_system.query_stream.return_value = iter(
+            [
+                {"delta": "Hello "},
+                {"delta": "world."},
+                {"sources": ["Source A"], "source_links": [None]},
+            ]
+        )
+        resp = client.post("/api/query/stream", json={"query": "hi", "session_id": "s1"})
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+
+        events = self._parse_sse(resp.text)
+        assert events[0] == {"delta": "Hello "}
+        assert events[1] == {"delta": "world."}
+        assert events[2] == {"sources": ["Source A"], "source_links": [None]}
+        assert events[3] == {"session_id": "s1"}
+        mock_rag_system.query_stream.assert_called_once_with("hi", "s1")
+
+    def test_stream_creates_session_when_missing(self, client, mock_rag_system):
+        mock_rag_system.query_stream.return_value = iter(
+            [{"delta": "x"}, {"sources": [], "source_links": []}]
+        )
+        resp = client.post("/api/query/stream", json={"query": "hi"})
+        assert resp.status_code == 200
+
+        events = self._parse_sse(resp.text)
+        assert events[-1] == {"session_id": "test-session-123"}
+
+
 # ---------------------------------------------------------------------------
 # /api/courses
 # ---------------------------------------------------------------------------
@@ -1,7 +1,9 @@
 """Tests for RAG system query pipeline with mocked dependencies."""
 
+import asyncio
+import contextvars
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 
 class TestRAGQueryPipeline:
@@ -45,6 +47,20 @@ class TestRAGQueryPipeline:
         assert sources == ["Course A - Lesson 1"]
         assert source_links == ["https://example.com/1"]
 
+    def test_aquery_returns_response_and_sources(self, mock_deps):
+        """Async variant returns the same (answer, sources, links) tuple."""
+        rag = mock_deps
+        rag.ai_generator.agenerate_response = AsyncMock(
+            return_value="This is the answer."
+        )
+
+        response, sources, source_links = asyncio.run(rag.aquery("What is MCP?"))
+
+        assert response == "This is the answer."
+        assert sources == ["Course A - Lesson 1"]
+        assert source_links == ["https://example.com/1"]
+        rag.tool_manager.reset_sources.assert_called_once()
+
     def test_query_passes_tools_to_generator(self, mock_deps):
         """get_tool_definitions() is passed to ai_generator.generate_response()."""
         rag = mock_deps
@@ -93,6 +109,52 @@ class TestRAGQueryPipeline:
         with pytest.raises(Exception, match="API auth failed"):
             rag.query("test question")
 
+    def test_stream_sources_survive_per_chunk_context_copies(self):
+        """Streamed sources reach the client under Starlette-style iteration.
+
+        Starlette resumes a sync SSE generator through worker threads, each
+        next() in a fresh copy of the handler's context - so ContextVar
+        state the tool round writes is discarded between resumptions. The
+        real ToolManager/CourseSearchTool are used here so the sources
+        actually live in ContextVars.
+        """
+        with (
+            patch("rag_system.DocumentProcessor"),
+            patch("rag_system.VectorStore"),
+            patch("rag_system.AIGenerator"),
+            patch("rag_system.SessionManager"),
+        ):
+            from rag_system import RAGSystem
+            from helpers import MockConfig
+
+            rag = RAGSystem(MockConfig())
+
+        def fake_stream(**kwargs):
+            # Stands in for the tool round: sets the ContextVar-backed
+            # sources in the same resumption that yields the first chunk
+            rag.search_tool.last_sources = ["Course A - Lesson 1"]
+            rag.search_tool.last_source_links = ["https://example.com/1"]
+            yield "Hello "
+            yield "world."
+
+        rag.ai_generator.generate_response_stream = fake_stream
+
+        events = []
+        stream = rag.query_stream("What is MCP?")
+        while True:
+            ctx = contextvars.copy_context()
+            try:
+                events.append(ctx.run(next, stream))
+            except StopIteration:
+                break
+
+        assert events[0] == {"delta": "Hello "}
+        assert events[1] == {"delta": "world."}
+        assert events[2] == {
+            "sources": ["Course A - Lesson 1"],
+            "source_links": ["https://example.com/1"],
+        }
+
     def test_query_with_session_passes_history(self, mock_deps):
         """Session history is passed as conversation_history parameter."""
         rag = mock_deps
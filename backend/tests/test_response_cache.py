@@ -0,0 +1,183 @@
+"""Tests for ResponseCache lookup/update and AIGenerator short-circuiting."""
+
+import pytest
+import numpy as np
+from unittest.mock import MagicMock, patch
+from response_cache import ResponseCache
+from ai_generator import AIGenerator
+from search_tools import CourseSearchTool, ToolManager
+from helpers import FakeStore, make_anthropic_response, make_valid_search_results
+
+
+@pytest.fixture
+def cache():
+    cache = ResponseCache()
+    # Stub the encoder so tests never load the real sentence transformer
+    encoder = MagicMock()
+    encoder.encode.side_effect = lambda texts: [
+        np.ones(4, dtype=np.float32) for _ in texts
+    ]
+    cache._encoder = encoder
+    return cache
+
+
+class TestResponseCache:
+    def test_exact_hit_after_update(self, cache):
+        """Same query/context returns the cached response."""
+        cache.update("What is MCP?", None, None, "MCP is a protocol.")
+
+        assert cache.lookup("What is MCP?") == "MCP is a protocol."
+
+    def test_normalized_query_hits_exact_tier(self, cache):
+        """Casing, punctuation, and whitespace differences still hit."""
+        cache.update("What is MCP?", None, None, "MCP is a protocol.")
+
+        assert cache.lookup("  what is   MCP ") == "MCP is a protocol."
+
+    def test_miss_on_different_history(self, cache):
+        """A different conversation context never reuses a cached answer."""
+        cache.update("What is MCP?", None, None, "MCP is a protocol.")
+
+        assert cache.lookup("What is MCP?", conversation_history="User: hi") is None
+
+    def test_semantic_hit_above_threshold(self, cache):
+        """A similar (not identical) query hits via embedding similarity."""
+        cache.update("What is MCP?", None, None, "MCP is a protocol.")
+
+        # Stubbed encoder returns identical vectors -> cosine similarity 1.0
+        assert cache.lookup("Explain MCP please") == "MCP is a protocol."
+
+    def test_bound_params_partition_signatures(self, cache):
+        """Changing the bound generation params invalidates prior entries."""
+        cache.bind_request_params({"model": "claude-sonnet-4-20250514"})
+        cache.update("What is MCP?", None, None, "MCP is a protocol.")
+
+        assert cache.lookup("What is MCP?") == "MCP is a protocol."
+
+        cache.bind_request_params({"model": "some-other-model"})
+        assert cache.lookup("What is MCP?") is None
+
+    def test_expired_entries_miss(self, cache):
+        """Entries older than the TTL are not returned."""
+        cache.ttl_seconds = 0
+        cache.update("What is MCP?", None, None, "MCP is a protocol.")
+
+        assert cache.lookup("What is MCP?") is None
+
+    def test_clear_drops_all_entries(self, cache):
+        """clear() (called on document ingest) invalidates every entry."""
+        cache.update("What is MCP?", None, None, "MCP is a protocol.")
+
+        cache.clear()
+
+        assert cache.lookup("What is MCP?") is None
+
+
+class TestGeneratorShortCircuit:
+    # The generator stores (response, sources, source_links) tuples so a
+    # cache hit can restore sources without re-running any tools
+
+    def test_cache_hit_skips_api_call(self, cache):
+        """On a cache hit, generate_response never calls the Anthropic API."""
+        with patch("ai_generator.anthropic.Anthropic"):
+            gen = AIGenerator(
+                api_key="test-key",
+                model="claude-sonnet-4-20250514",
+                response_cache=cache,
+            )
+        cache.update("What is MCP?", None, None, ("MCP is a protocol.", [], []))
+
+        result = gen.generate_response(query="What is MCP?")
+
+        assert result == "MCP is a protocol."
+        gen.client.messages.create.assert_not_called()
+
+    def test_cache_hit_restores_sources(self, cache):
+        """A hit re-populates the tool manager's sources for the caller."""
+        with patch("ai_generator.anthropic.Anthropic"):
+            gen = AIGenerator(
+                api_key="test-key",
+                model="claude-sonnet-4-20250514",
+                response_cache=cache,
+            )
+        tool_manager = ToolManager()
+        tool_manager.register_tool(CourseSearchTool(FakeStore()))
+        cache.update(
+            "What is MCP?",
+            None,
+            None,
+            ("MCP is a protocol.", ["Course A - Lesson 1"], ["https://example.com/1"]),
+        )
+
+        result = gen.generate_response(query="What is MCP?", tool_manager=tool_manager)
+
+        assert result == "MCP is a protocol."
+        assert tool_manager.get_last_sources() == ["Course A - Lesson 1"]
+        assert tool_manager.get_last_source_links() == ["https://example.com/1"]
+
+    def test_cache_miss_stores_response(self, cache):
+        """On a miss, the generated response is stored for the next call."""
+        with patch("ai_generator.anthropic.Anthropic"):
+            gen = AIGenerator(
+                api_key="test-key",
+                model="claude-sonnet-4-20250514",
+                response_cache=cache,
+            )
+        response = MagicMock()
+        response.stop_reason = "end_turn"
+        block = MagicMock()
+        block.text = "Fresh answer."
+        response.content = [block]
+        gen.client.messages.create.return_value = response
+
+        assert gen.generate_response(query="New question") == "Fresh answer."
+        assert cache.lookup("New question") == ("Fresh answer.", [], [])
+
+    def test_streamed_response_caches_sources(self, cache):
+        """A streamed query caches the sources its tool round produced.
+
+        Mirrors the SSE caller, which reads and resets the ContextVar-backed
+        sources at the first chunk - the generator must snapshot them for
+        the cache before that, not at stream end.
+        """
+        with patch("ai_generator.anthropic.Anthropic"):
+            gen = AIGenerator(
+                api_key="test-key",
+                model="claude-sonnet-4-20250514",
+                response_cache=cache,
+            )
+        store = FakeStore()
+        store.search.return_value = make_valid_search_results(1)
+        tool_manager = ToolManager()
+        tool_manager.register_tool(CourseSearchTool(store))
+        tools = tool_manager.get_tool_definitions()
+
+        tool_response = make_anthropic_response(
+            [
+                {
+                    "type": "tool_use",
+                    "id": "t1",
+                    "name": "search_course_content",
+                    "input": {"query": "mcp"},
+                }
+            ],
+            stop_reason="tool_use",
+        )
+        final_response = make_anthropic_response(
+            [{"type": "text", "text": "Answer text."}], stop_reason="end_turn"
+        )
+        gen.client.messages.create.side_effect = [tool_response, final_response]
+
+        chunks = []
+        for chunk in gen.generate_response_stream(
+            query="What is MCP?", tools=tools, tool_manager=tool_manager
+        ):
+            if not chunks:
+                tool_manager.reset_sources()
+            chunks.append(chunk)
+
+        assert cache.lookup("What is MCP?", tools=tools) == (
+            "Answer text.",
+            ["Course 0 - Lesson 1"],
+            ["https://example.com/lesson"],
+        )
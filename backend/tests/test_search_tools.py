@@ -1,81 +1,168 @@
 """Tests for CourseSearchTool.execute() and ToolManager dispatch."""
 
+import asyncio
+import contextvars
+import re
+
 import pytest
-from unittest.mock import MagicMock, patch
-from helpers import make_search_results, make_valid_search_results
+from helpers import (
+    FakeStore,
+    assert_has_sources,
+    cassette_search,
+    make_search_results,
+    make_valid_search_results,
+)
 from search_tools import CourseSearchTool, ToolManager
 from vector_store import SearchResults
 
 
-@pytest.fixture
+# Fixtures are session-scoped: nothing here mutates state that outlives a
+# single test (only return_value/side_effect, cleared below), so the store
+# stub, tool, and registered manager are each built exactly once per run.
+# Tests that mutate registration state use fresh_tool_manager instead.
+
+
+@pytest.fixture(scope="session")
 def mock_store():
-    store = MagicMock()
-    store.get_lesson_link = MagicMock(return_value="https://example.com/lesson")
-    return store
+    return FakeStore()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def search_tool(mock_store):
     return CourseSearchTool(mock_store)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def tool_manager(search_tool):
     tm = ToolManager()
     tm.register_tool(search_tool)
     return tm
 
 
-class TestCourseSearchToolExecute:
-    def test_execute_returns_formatted_results(self, search_tool, mock_store):
-        """Valid search results are formatted as [Course - Lesson N]\\ncontent."""
-        results = make_valid_search_results(2)
-        mock_store.search.return_value = results
-
-        output = search_tool.execute(query="test query")
+@pytest.fixture
+def fresh_tool_manager(search_tool):
+    """Function-scoped manager for tests that mutate registration or memo state."""
+    tm = ToolManager()
+    tm.register_tool(search_tool, can_memoize=True)
+    return tm
 
-        assert "[Course 0 - Lesson 1]" in output
-        assert "Content about topic 0" in output
-        assert "[Course 1 - Lesson 2]" in output
-        assert "Content about topic 1" in output
 
-    def test_execute_populates_sources(self, search_tool, mock_store):
-        """last_sources and last_source_links are populated after execution."""
-        results = make_valid_search_results(2)
-        mock_store.search.return_value = results
+@pytest.fixture(autouse=True)
+def _reset_search_state(mock_store, search_tool, tool_manager):
+    """Clear per-test state from the shared module-scoped fixtures."""
+    yield
+    mock_store.reset_mock(return_value=True, side_effect=True)
+    search_tool.last_sources = []
+    search_tool.last_source_links = []
+    # The memo ContextVar outlives a test in pytest's main context
+    tool_manager.reset_memo_cache()
+
+
+# Assertion helpers for the parametrized execute() cases below
+
+# Validates every [Course N - Lesson M]\ncontent pair in one pass instead
+# of a substring scan per fragment
+_FMT_RE = re.compile(r"\[Course (\d+) - Lesson (\d+)\]\n(Content about topic \d+)")
+
+
+def _check_formatted(output, tool):
+    assert _FMT_RE.findall(output) == [
+        ("0", "1", "Content about topic 0"),
+        ("1", "2", "Content about topic 1"),
+    ]
+
+
+def _check_sources(output, tool):
+    assert len(tool.last_sources) == 2
+    assert_has_sources(tool, "Course 0 - Lesson 1", "Course 1 - Lesson 2")
+    assert len(tool.last_source_links) == 2
+
+
+def _check_error(output, tool):
+    assert "No course found matching 'xyz'" in output
+
+
+def _check_empty(output, tool):
+    assert "No relevant content found" in output
+
+
+def _check_empty_filters(output, tool):
+    assert "in course 'MCP'" in output
+    assert "in lesson 3" in output
+
+
+# One (search outcome, execute kwargs, assertions) row per former test -
+# parametrize keeps the coverage while paying test-node setup once
+_EXECUTE_CASES = [
+    pytest.param(
+        lambda: make_valid_search_results(2),
+        {"query": "test query"},
+        _check_formatted,
+        id="formatted",
+    ),
+    pytest.param(
+        lambda: make_valid_search_results(2),
+        {"query": "test query"},
+        _check_sources,
+        id="sources",
+    ),
+    pytest.param(
+        lambda: make_search_results(error="No course found matching 'xyz'"),
+        {"query": "test", "course_name": "xyz"},
+        _check_error,
+        id="error",
+    ),
+    pytest.param(
+        lambda: make_search_results(),
+        {"query": "nonexistent topic"},
+        _check_empty,
+        id="empty",
+    ),
+    pytest.param(
+        lambda: make_search_results(),
+        {"query": "topic", "course_name": "MCP", "lesson_number": 3},
+        _check_empty_filters,
+        id="empty_filters",
+    ),
+]
 
-        search_tool.execute(query="test query")
 
-        assert len(search_tool.last_sources) == 2
-        assert "Course 0 - Lesson 1" in search_tool.last_sources
-        assert len(search_tool.last_source_links) == 2
+class TestCourseSearchToolExecute:
+    @pytest.mark.parametrize("results_factory, kwargs, check", _EXECUTE_CASES)
+    def test_execute_outcomes(
+        self, search_tool, mock_store, results_factory, kwargs, check
+    ):
+        """execute() output and source tracking per search outcome."""
+        mock_store.search.return_value = results_factory()
 
-    def test_execute_error_from_search(self, search_tool, mock_store):
-        """When SearchResults.error is set, execute returns the error string."""
-        mock_store.search.return_value = make_search_results(
-            error="No course found matching 'xyz'"
-        )
+        output = search_tool.execute(**kwargs)
 
-        output = search_tool.execute(query="test", course_name="xyz")
+        check(output, search_tool)
 
-        assert "No course found matching 'xyz'" in output
+    def test_sources_isolated_per_async_task(self, search_tool):
+        """Concurrent tasks see their own last_sources (ContextVar-backed)."""
 
-    def test_execute_empty_results(self, search_tool, mock_store):
-        """When no documents found, returns 'No relevant content found'."""
-        mock_store.search.return_value = make_search_results()
+        async def worker(label):
+            search_tool.last_sources = [label]
+            await asyncio.sleep(0)
+            return search_tool.last_sources
 
-        output = search_tool.execute(query="nonexistent topic")
+        async def main():
+            return await asyncio.gather(worker("a"), worker("b"))
 
-        assert "No relevant content found" in output
+        assert asyncio.run(main()) == [["a"], ["b"]]
 
-    def test_execute_empty_with_filters(self, search_tool, mock_store):
-        """Empty results with course_name/lesson filters include filter info."""
-        mock_store.search.return_value = make_search_results()
+    def test_execute_replays_recorded_results(self, search_tool, mock_store):
+        """Recorded search results replay from the JSON cassette."""
+        mock_store.search.side_effect = cassette_search
 
-        output = search_tool.execute(query="topic", course_name="MCP", lesson_number=3)
+        output = search_tool.execute(
+            query="mcp basics", course_name="MCP", lesson_number=1
+        )
 
-        assert "in course 'MCP'" in output
-        assert "in lesson 3" in output
+        assert "[MCP: Build Rich-Context AI Apps - Lesson 1]" in output
+        assert "MCP servers expose tools and resources" in output
+        assert_has_sources(search_tool, "MCP: Build Rich-Context AI Apps - Lesson 1")
 
     def test_execute_exception_propagates(self, search_tool, mock_store):
         """When store.search() raises, exception propagates (not caught)."""
@@ -88,6 +175,8 @@ class TestCourseSearchToolExecute:
         """Tool definition has correct name, required params, schema."""
         defn = search_tool.get_tool_definition()
 
+        # cached_property: repeated calls serve the same dict
+        assert search_tool.get_tool_definition() is defn
         assert defn["name"] == "search_course_content"
         assert defn["input_schema"]["required"] == ["query"]
         assert "query" in defn["input_schema"]["properties"]
@@ -107,8 +196,82 @@ class TestToolManager:
         )
         assert "[Course 0 - Lesson 1]" in result
 
+    def test_dispatches_batch(self, tool_manager, mock_store):
+        """execute_tool_batch runs all calls and keeps call order."""
+        mock_store.search.return_value = make_valid_search_results(1)
+
+        results = tool_manager.execute_tool_batch(
+            [
+                ("search_course_content", {"query": "query A"}),
+                ("search_course_content", {"query": "query B"}),
+                ("nonexistent_tool", {"query": "query C"}),
+            ]
+        )
+
+        assert len(results) == 3
+        assert "[Course 0 - Lesson 1]" in results[0]
+        assert "[Course 0 - Lesson 1]" in results[1]
+        assert "not found" in results[2].lower()
+        assert mock_store.search.call_count == 2
+
     def test_unknown_tool_returns_error(self, tool_manager):
         """Unknown tool name returns error string, not exception."""
         result = tool_manager.execute_tool("nonexistent_tool", query="test")
 
         assert "not found" in result.lower()
+
+    def test_memoized_tool_executes_once_for_identical_calls(
+        self, fresh_tool_manager, mock_store
+    ):
+        """With can_memoize=True, a repeated identical call hits the cache."""
+        tm = fresh_tool_manager
+        mock_store.search.return_value = make_valid_search_results(1)
+
+        first = tm.execute_tool("search_course_content", query="test query")
+        second = tm.execute_tool("search_course_content", query="test query")
+
+        assert first == second
+        mock_store.search.assert_called_once()
+
+    def test_memo_scoped_per_request_context(self, fresh_tool_manager, mock_store):
+        """Concurrent requests (separate contexts) never share memo entries."""
+        tm = fresh_tool_manager
+        mock_store.search.return_value = make_valid_search_results(1)
+
+        for _ in range(2):
+            ctx = contextvars.copy_context()
+            ctx.run(tm.execute_tool, "search_course_content", query="test query")
+
+        # Each context executed for real - a shared memo would have skipped
+        # the second search (and its source tracking)
+        assert mock_store.search.call_count == 2
+
+    def test_memo_cache_reset_between_queries(self, fresh_tool_manager, mock_store):
+        """reset_memo_cache() forces re-execution on the next query."""
+        tm = fresh_tool_manager
+        mock_store.search.return_value = make_valid_search_results(1)
+
+        tm.execute_tool("search_course_content", query="test query")
+        tm.reset_memo_cache()
+        tm.execute_tool("search_course_content", query="test query")
+
+        assert mock_store.search.call_count == 2
+
+    def test_tool_definitions_cached_by_identity(self, fresh_tool_manager, search_tool):
+        """Repeated get_tool_definitions() calls return the same list object."""
+        first = fresh_tool_manager.get_tool_definitions()
+
+        assert fresh_tool_manager.get_tool_definitions() is first
+
+        # Registering a new tool invalidates the cached list
+        fresh_tool_manager.register_tool(search_tool)
+        assert fresh_tool_manager.get_tool_definitions() is not first
+
+    def test_unmemoized_tool_always_executes(self, tool_manager, mock_store):
+        """Default registration (can_memoize=False) never caches."""
+        mock_store.search.return_value = make_valid_search_results(1)
+
+        tool_manager.execute_tool("search_course_content", query="test query")
+        tool_manager.execute_tool("search_course_content", query="test query")
+
+        assert mock_store.search.call_count == 2